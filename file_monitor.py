@@ -1,216 +1,762 @@
 #!/usr/bin/env python3
 """
 Simple File Monitor for Linux File Search App
-Uses polling method to detect file changes
+Uses inotify to detect file changes, falling back to polling when unavailable
 """
 
+import ctypes
+import ctypes.util
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+import errno
+import logging
 import os
+import queue
+import select
+import struct
 import threading
 import time
 from pathlib import Path
 
 
+logger = logging.getLogger(__name__)
+
+# inotify event flags (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_CREATE | IN_MODIFY | IN_DELETE | IN_MOVED_FROM |
+              IN_MOVED_TO | IN_ATTRIB | IN_DELETE_SELF)
+
+# struct inotify_event header: wd, mask, cookie, len
+_EVENT_HEADER = struct.Struct('iIII')
+
+# Put on the callback queue by stop() to end the callback worker
+_STOP = object()
+
+# statx(2) constants, only the inode, mtime and size are requested
+AT_FDCWD = -100
+AT_SYMLINK_NOFOLLOW = 0x100
+AT_STATX_DONT_SYNC = 0x4000
+STATX_MTIME = 0x00000040
+STATX_INO = 0x00000100
+STATX_SIZE = 0x00000200
+
+_STATX_FLAGS = AT_STATX_DONT_SYNC | AT_SYMLINK_NOFOLLOW
+_STATX_MASK = STATX_MTIME | STATX_INO | STATX_SIZE
+
+
+class _StatxTimestamp(ctypes.Structure):
+    _fields_ = [
+        ('tv_sec', ctypes.c_int64),
+        ('tv_nsec', ctypes.c_uint32),
+        ('_reserved', ctypes.c_int32),
+    ]
+
+
+class _Statx(ctypes.Structure):
+    """Mirror of struct statx from <linux/stat.h>"""
+    _fields_ = [
+        ('stx_mask', ctypes.c_uint32),
+        ('stx_blksize', ctypes.c_uint32),
+        ('stx_attributes', ctypes.c_uint64),
+        ('stx_nlink', ctypes.c_uint32),
+        ('stx_uid', ctypes.c_uint32),
+        ('stx_gid', ctypes.c_uint32),
+        ('stx_mode', ctypes.c_uint16),
+        ('_spare0', ctypes.c_uint16),
+        ('stx_ino', ctypes.c_uint64),
+        ('stx_size', ctypes.c_uint64),
+        ('stx_blocks', ctypes.c_uint64),
+        ('stx_attributes_mask', ctypes.c_uint64),
+        ('stx_atime', _StatxTimestamp),
+        ('stx_btime', _StatxTimestamp),
+        ('stx_ctime', _StatxTimestamp),
+        ('stx_mtime', _StatxTimestamp),
+        ('stx_rdev_major', ctypes.c_uint32),
+        ('stx_rdev_minor', ctypes.c_uint32),
+        ('stx_dev_major', ctypes.c_uint32),
+        ('stx_dev_minor', ctypes.c_uint32),
+        ('_spare2', ctypes.c_uint64 * 14),
+    ]
+
+
+def _load_statx():
+    """Return libc's statx function, or None if libc or the kernel lack it"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        statx = libc.statx
+    except (OSError, AttributeError):
+        return None
+    
+    statx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int,
+                      ctypes.c_uint, ctypes.POINTER(_Statx)]
+    statx.restype = ctypes.c_int
+    
+    # glibc may provide the wrapper on a kernel without the syscall
+    buf = _Statx()
+    if statx(AT_FDCWD, b'/', _STATX_FLAGS, _STATX_MASK, ctypes.byref(buf)) != 0:
+        if ctypes.get_errno() == errno.ENOSYS:
+            return None
+    return statx
+
+
+_libc_statx = _load_statx()
+
+
+def stat_file(path, dir_fd=None):
+    """
+    Return (inode, mtime_ns, size) for path without following symlinks
+    
+    Uses statx(2) asking only for those fields, with AT_STATX_DONT_SYNC
+    so network filesystems may answer from cached attributes. Falls back to
+    os.lstat when statx is unavailable. With dir_fd, path is a name relative
+    to that open directory, so the kernel does not resolve the full path.
+    """
+    if _libc_statx is not None:
+        buf = _Statx()
+        at_fd = AT_FDCWD if dir_fd is None else dir_fd
+        if _libc_statx(at_fd, os.fsencode(path), _STATX_FLAGS, _STATX_MASK, ctypes.byref(buf)) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        if buf.stx_mask & _STATX_MASK == _STATX_MASK:
+            mtime = buf.stx_mtime
+            return buf.stx_ino, mtime.tv_sec * 1000000000 + mtime.tv_nsec, buf.stx_size
+    
+    stat_info = os.stat(path, dir_fd=dir_fd, follow_symlinks=False)
+    return stat_info.st_ino, stat_info.st_mtime_ns, stat_info.st_size
+
+
+class Inotify:
+    """Minimal ctypes binding for the Linux inotify API"""
+    
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._inotify_add_watch = libc.inotify_add_watch
+        self._inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._inotify_add_watch.restype = ctypes.c_int
+        
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+    
+    def add_watch(self, path, mask=WATCH_MASK):
+        """Watch a single directory, returns the watch descriptor"""
+        wd = self._inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+    
+    def read_events(self):
+        """Read pending events as (wd, mask, name) tuples"""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+    
+    def close(self):
+        """Close the inotify file descriptor"""
+        if self.fd is not None and self.fd >= 0:
+            os.close(self.fd)
+        self.fd = None
+
+
 class FileMonitor:
-    """Simple file system monitor using polling"""
+    """
+    Simple file system monitor using inotify, with polling as a fallback
     
-    def __init__(self, paths, callback):
+    The polling cache records modification times as integer nanoseconds
+    (st_mtime_ns) so comparisons are exact on filesystems with sub-second
+    timestamps.
+    """
+    
+    def __init__(self, paths, callback, trust_dir_mtime=False, skip_dirs=frozenset()):
         """
         Initialize file monitor
         
         Args:
             paths: List of paths to monitor
-            callback: Function to call when files change (event_type, file_path)
+            callback: Function to call when files change
+                (event_type, root_path, changed_path), where changed_path is the
+                deepest directory under root_path containing every change in the batch
+            trust_dir_mtime: When polling, reuse cached file stats for directories
+                whose mtime is unchanged (misses in-place file modifications)
+            skip_dirs: Directory names that are neither watched nor scanned,
+                like the build and dependency folders the indexer skips
         """
         self.paths = [str(Path(p).resolve()) for p in paths]
         self.callback = callback
+        self.trust_dir_mtime = trust_dir_mtime
+        self.skip_dirs = frozenset(skip_dirs)
         self.running = False
         self.thread = None
-        self.file_cache = {}
-        self.batch_timer = None
-        self.pending_changes = set()
+        self._stop_event = threading.Event()
+        # Polling interval bounds in seconds, backs off while idle
+        self._min_interval = 1
+        self._max_interval = 300
+        # File cache stored as parallel arrays of (dir_id, name) keys, inodes,
+        # mtimes and sizes; _index maps key -> slot
+        self._keys = []
+        self._inodes = array('Q')
+        self._mtimes = array('q')
+        self._sizes = array('q')
+        self._index = {}
+        # ((dir_id, name), mtime_ns, size) tuples for set-based change detection
+        self._cache_set = set()
+        # Interned directory paths, a file key refers to its directory by id;
+        # ids of directories that disappeared are freed and reused
+        self._dir_table = []
+        self._dir_ids = {}
+        self._free_dir_ids = []
+        self._dir_lock = threading.Lock()
+        # dir path -> (dir mtime_ns, file names, subdir names) from the last scan
+        self._dir_cache = {}
+        # Thread pool used to scan roots concurrently while polling
+        self._pool = None
+        self.batch_delay = 5.0
+        # (root_path, changed dir, monotonic time) items produced by the watch
+        # loops and consumed by a single callback thread
+        self._callback_queue = queue.Queue(maxsize=1024)
+        self._callback_thread = None
+        self.inotify = None
+        self.watch_dirs = {}
+        # Pipe written by stop() to wake the inotify loop out of poll()
+        self._wake_pipe = None
+        
+        # Roots bucketed by first path component, deepest root first
+        self._roots_by_top = {}
+        for path in sorted(self.paths, key=len, reverse=True):
+            prefix = path.rstrip(os.sep) + os.sep
+            self._roots_by_top.setdefault(self._top_component(path), []).append((path, prefix))
         
-        print(f"FileMonitor initialized for paths: {self.paths}")
+        # Roots not inside another root; only these are watched or scanned,
+        # nested roots are covered by their ancestor's tree
+        self._top_paths = []
+        for path in sorted(set(self.paths), key=len):
+            if not any(path.startswith(top.rstrip(os.sep) + os.sep) for top in self._top_paths):
+                self._top_paths.append(path)
+        
+        logger.info("FileMonitor initialized for paths: %s", self.paths)
     
     def start(self):
         """Start monitoring"""
         if self.running:
-            print("FileMonitor already running")
+            logger.info("FileMonitor already running")
             return True
             
         try:
-            # Initialize file cache
-            self._build_file_cache()
+            if self._start_inotify():
+                target = self._inotify_loop
+            else:
+                # Initialize file cache for polling
+                if len(self._top_paths) > 1:
+                    self._pool = ThreadPoolExecutor(max_workers=min(8, len(self._top_paths)))
+                self._build_file_cache()
+                target = self._monitor_loop
             
             self.running = True
-            self.thread = threading.Thread(target=self._monitor_loop, daemon=True)
+            self._stop_event.clear()
+            self.thread = threading.Thread(target=target, daemon=True)
             self.thread.start()
-            print(f"FileMonitor started successfully for {len(self.paths)} paths")
+            self._callback_thread = threading.Thread(target=self._callback_worker, daemon=True)
+            self._callback_thread.start()
+            logger.info("FileMonitor started successfully for %d paths", len(self.paths))
             return True
                 
         except Exception as e:
-            print(f"Failed to start file monitoring: {e}")
+            logger.error("Failed to start file monitoring: %s", e)
             return False
     
     def stop(self):
         """Stop monitoring"""
-        print("Stopping FileMonitor...")
+        logger.info("Stopping FileMonitor...")
         self.running = False
+        self._stop_event.set()
         
-        if self.batch_timer:
-            self.batch_timer.cancel()
-            self.batch_timer = None
+        if self._wake_pipe:
+            os.write(self._wake_pipe[1], b'\0')
         
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout=3)
         
-        print("FileMonitor stopped")
+        if self._callback_thread and self._callback_thread.is_alive():
+            self._callback_queue.put(_STOP)
+            self._callback_thread.join(timeout=3)
+        
+        if self._pool:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+        
+        if self.inotify:
+            self.inotify.close()
+            self.inotify = None
+            self.watch_dirs.clear()
+        
+        if self._wake_pipe:
+            for fd in self._wake_pipe:
+                os.close(fd)
+            self._wake_pipe = None
+        
+        logger.info("FileMonitor stopped")
     
-    def _build_file_cache(self):
-        """Build initial cache of file modification times"""
-        print("Building initial file cache...")
-        self.file_cache.clear()
+    def _start_inotify(self):
+        """Set up inotify watches, returns False if polling should be used instead"""
+        try:
+            self.inotify = Inotify()
+            for path in self._top_paths:
+                if not os.path.exists(path):
+                    logger.warning("Path does not exist: %s", path)
+                    continue
+                self._add_watches(path)
+            
+            self._wake_pipe = os.pipe()
+            logger.info("inotify watching %d directories", len(self.watch_dirs))
+            return True
+            
+        except (OSError, AttributeError) as e:
+            logger.warning("inotify unavailable, falling back to polling: %s", e)
+            if self.inotify:
+                self.inotify.close()
+                self.inotify = None
+            self.watch_dirs.clear()
+            return False
+    
+    def _add_watches(self, path):
+        """Recursively add inotify watches for a directory tree"""
+        skip_dirs = self.skip_dirs
+        for root, dirs, files in os.walk(path):
+            # Skip hidden and excluded directories
+            dirs[:] = [d for d in dirs if d[:1] != '.' and d not in skip_dirs]
+            
+            try:
+                wd = self.inotify.add_watch(root)
+            except OSError as e:
+                # Running out of watches means inotify can't cover the tree
+                if e.errno == errno.ENOSPC:
+                    raise
+                continue
+            self.watch_dirs[wd] = root
+    
+    def _inotify_loop(self):
+        """Main monitoring loop blocking on inotify events"""
+        logger.debug("FileMonitor inotify loop started")
+        poller = select.poll()
+        poller.register(self.inotify.fd, select.POLLIN)
+        poller.register(self._wake_pipe[0], select.POLLIN)
         
-        for path in self.paths:
-            if not os.path.exists(path):
-                print(f"Warning: Path does not exist: {path}")
+        while not self._stop_event.is_set():
+            try:
+                # Blocks until an event arrives or stop() writes to the wake pipe
+                poller.poll()
+                if self._stop_event.is_set():
+                    break
+                
+                for wd, mask, name in self.inotify.read_events():
+                    if mask & IN_Q_OVERFLOW:
+                        # Kernel dropped events, treat every root as changed
+                        for path in self.paths:
+                            self._queue_change(path)
+                        continue
+                    
+                    if mask & IN_IGNORED:
+                        self.watch_dirs.pop(wd, None)
+                        continue
+                    
+                    dir_path = self.watch_dirs.get(wd)
+                    if dir_path is None or name[:1] == '.':
+                        continue
+                    
+                    file_path = os.path.join(dir_path, name) if name else dir_path
+                    
+                    # Newly created or moved-in directories need their own watches
+                    if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and name not in self.skip_dirs:
+                        self._add_watches(file_path)
+                    
+                    # Rescanning the watched directory covers the entry and,
+                    # for directories, everything created or removed below it
+                    self._queue_change(dir_path)
+                    
+            except Exception as e:
+                logger.error("Error in inotify loop: %s", e)
+                self._stop_event.wait(timeout=1)
+        
+        logger.debug("FileMonitor inotify loop ended")
+    
+    def _dir_id(self, dir_path):
+        """Return the id of dir_path in the directory table, adding it if new"""
+        dir_id = self._dir_ids.get(dir_path)
+        if dir_id is None:
+            with self._dir_lock:
+                dir_id = self._dir_ids.get(dir_path)
+                if dir_id is None:
+                    if self._free_dir_ids:
+                        dir_id = self._free_dir_ids.pop()
+                        self._dir_table[dir_id] = dir_path
+                    else:
+                        dir_id = len(self._dir_table)
+                        self._dir_table.append(dir_path)
+                    self._dir_ids[dir_path] = dir_id
+        return dir_id
+    
+    def _prune_dir_table(self):
+        """
+        Free the ids of directories the last scan did not see
+        
+        Call only once the cache holds the last scan's keys: those refer to
+        directories in _dir_cache alone, so no live key uses a freed id.
+        """
+        live_dirs = self._dir_cache
+        if len(self._dir_ids) == len(live_dirs):
+            # Every interned directory was seen again, nothing to free
+            return
+        with self._dir_lock:
+            for dir_path in [d for d in self._dir_ids if d not in live_dirs]:
+                dir_id = self._dir_ids.pop(dir_path)
+                self._dir_table[dir_id] = None
+                self._free_dir_ids.append(dir_id)
+    
+    def _full_path(self, key):
+        """Rebuild the full path for a (dir_id, name) cache key"""
+        dir_id, name = key
+        return os.path.join(self._dir_table[dir_id], name)
+    
+    def _scan(self, path, dir_cache, keys, inodes, mtimes, sizes):
+        """
+        Append every non-hidden file under path to the keys/inodes/mtimes/sizes columns
+        
+        Directories whose own mtime is unchanged since the last scan have no
+        added, removed or renamed entries, so their cached listing is reused
+        instead of re-reading them. Listings seen in this scan go to dir_cache.
+        With trust_dir_mtime, files in such directories reuse their cached
+        stats instead of being stat'ed again; files in changed directories
+        are always stat'ed.
+        """
+        # Bind hot callables once, the loop below runs per file
+        add_key = keys.append
+        add_inode = inodes.append
+        add_mtime = mtimes.append
+        add_size = sizes.append
+        sep = os.sep
+        skip_dirs = self.skip_dirs
+        trusted_index = self._index if self.trust_dir_mtime else {}
+        old_inodes = self._inodes
+        old_mtimes = self._mtimes
+        old_sizes = self._sizes
+        
+        stack = [path]
+        while stack:
+            dir_path = stack.pop()
+            try:
+                dir_mtime = os.stat(dir_path).st_mtime_ns
+            except OSError:
                 continue
+            
+            dir_id = self._dir_id(dir_path)
+            # Concatenation is much cheaper than os.path.join per file
+            prefix = dir_path if dir_path.endswith(sep) else dir_path + sep
+            cached = self._dir_cache.get(dir_path)
+            if cached is not None and cached[0] == dir_mtime:
+                _, file_names, subdir_names = cached
+                dir_cache[dir_path] = cached
+                stack.extend(prefix + name for name in subdir_names)
                 
+                # Files are stat'ed relative to the directory, opened only
+                # once one of them actually needs a stat
+                dir_fd = None
+                for name in file_names:
+                    key = (dir_id, name)
+                    slot = trusted_index.get(key)
+                    if slot is not None:
+                        add_key(key)
+                        add_inode(old_inodes[slot])
+                        add_mtime(old_mtimes[slot])
+                        add_size(old_sizes[slot])
+                        continue
+                    
+                    try:
+                        if dir_fd is None:
+                            dir_fd = os.open(dir_path, os.O_RDONLY | os.O_DIRECTORY)
+                        inode, mtime, size = stat_file(name, dir_fd)
+                    except OSError:
+                        continue
+                    add_key(key)
+                    add_inode(inode)
+                    add_mtime(mtime)
+                    add_size(size)
+                if dir_fd is not None:
+                    os.close(dir_fd)
+                continue
+            
+            try:
+                dir_fd = os.open(dir_path, os.O_RDONLY | os.O_DIRECTORY)
+            except OSError:
+                continue
             try:
-                for root, dirs, files in os.walk(path):
-                    # Skip hidden directories
-                    dirs[:] = [d for d in dirs if not d.startswith('.')]
+                it = os.scandir(dir_fd)
+            except OSError:
+                os.close(dir_fd)
+                continue
+            
+            file_names = []
+            subdir_names = []
+            try:
+                for entry in it:
+                    name = entry.name
+                    if name[:1] == '.':
+                        continue
                     
-                    for file in files:
-                        if file.startswith('.'):
-                            continue
-                            
-                        file_path = os.path.join(root, file)
-                        try:
-                            stat_info = os.stat(file_path)
-                            self.file_cache[file_path] = {
-                                'mtime': stat_info.st_mtime,
-                                'size': stat_info.st_size
-                            }
-                        except (OSError, PermissionError):
-                            continue
-            except Exception as e:
-                print(f"Error building cache for {path}: {e}")
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if name not in skip_dirs:
+                                stack.append(prefix + name)
+                                subdir_names.append(name)
+                        elif entry.is_file(follow_symlinks=False):
+                            key = (dir_id, name)
+                            # A changed directory may hold files edited in place
+                            # (same inode, new size), so every file is stat'ed
+                            inode, mtime, size = stat_file(name, dir_fd)
+                            file_names.append(name)
+                            add_key(key)
+                            add_inode(inode)
+                            add_mtime(mtime)
+                            add_size(size)
+                    except OSError:
+                        continue
+            finally:
+                it.close()
+                os.close(dir_fd)
+            
+            dir_cache[dir_path] = (dir_mtime, tuple(file_names), tuple(subdir_names))
+    
+    def _scan_one(self, path):
+        """Scan a single monitored path into (keys, inodes, mtimes, sizes, dir_cache)"""
+        keys = []
+        inodes = array('Q')
+        mtimes = array('q')
+        sizes = array('q')
+        dir_cache = {}
         
-        print(f"File cache built with {len(self.file_cache)} files")
+        if not os.path.exists(path):
+            return keys, inodes, mtimes, sizes, dir_cache
+            
+        try:
+            self._scan(path, dir_cache, keys, inodes, mtimes, sizes)
+        except Exception as e:
+            logger.error("Error scanning %s: %s", path, e)
+        
+        return keys, inodes, mtimes, sizes, dir_cache
+    
+    def _scan_all(self):
+        """Scan all monitored paths into parallel (keys, inodes, mtimes, sizes, index) arrays"""
+        # scandir/stat release the GIL, so roots are walked concurrently
+        if self._pool and len(self._top_paths) > 1:
+            results = list(self._pool.map(self._scan_one, self._top_paths))
+        else:
+            results = list(map(self._scan_one, self._top_paths))
+        
+        if len(results) == 1:
+            # Single root: use its columns as-is instead of copying them
+            keys, inodes, mtimes, sizes, dir_cache = results[0]
+        else:
+            keys = []
+            inodes = array('Q')
+            mtimes = array('q')
+            sizes = array('q')
+            dir_cache = {}
+            for root_keys, root_inodes, root_mtimes, root_sizes, root_dirs in results:
+                keys.extend(root_keys)
+                inodes.extend(root_inodes)
+                mtimes.extend(root_mtimes)
+                sizes.extend(root_sizes)
+                dir_cache.update(root_dirs)
+        
+        self._dir_cache = dir_cache
+        # Build the key -> slot index in one C-level pass
+        index = dict(zip(keys, range(len(keys))))
+        return keys, inodes, mtimes, sizes, index
+    
+    def _build_file_cache(self):
+        """Build initial cache of file modification times"""
+        logger.info("Building initial file cache...")
+        
+        for path in self.paths:
+            if not os.path.exists(path):
+                logger.warning("Path does not exist: %s", path)
+        
+        self._keys, self._inodes, self._mtimes, self._sizes, self._index = self._scan_all()
+        self._cache_set = set(zip(self._keys, self._mtimes, self._sizes))
+        self._prune_dir_table()
+        
+        logger.info("File cache built with %d files", len(self._keys))
     
     def _monitor_loop(self):
         """Main monitoring loop using polling"""
-        print("FileMonitor loop started")
-        poll_interval = 10  # Check every 10 seconds
+        logger.debug("FileMonitor loop started")
+        poll_interval = self._min_interval
         
-        while self.running:
+        while not self._stop_event.is_set():
             try:
-                changes_detected = False
-                current_files = {}
+                # root path -> deepest directory containing its changes
+                changed_roots = {}
                 
                 # Scan all monitored paths
-                for path in self.paths:
-                    if not os.path.exists(path):
-                        continue
-                        
-                    try:
-                        for root, dirs, files in os.walk(path):
-                            # Skip hidden directories
-                            dirs[:] = [d for d in dirs if not d.startswith('.')]
-                            
-                            for file in files:
-                                if file.startswith('.'):
-                                    continue
-                                    
-                                file_path = os.path.join(root, file)
-                                try:
-                                    stat_info = os.stat(file_path)
-                                    current_files[file_path] = {
-                                        'mtime': stat_info.st_mtime,
-                                        'size': stat_info.st_size
-                                    }
-                                except (OSError, PermissionError):
-                                    continue
-                    except Exception as e:
-                        print(f"Error scanning {path}: {e}")
-                        continue
+                keys, inodes, mtimes, sizes, index = self._scan_all()
                 
-                # Check for new or modified files
-                for file_path, file_info in current_files.items():
-                    if file_path not in self.file_cache:
-                        # New file
-                        print(f"New file detected: {file_path}")
-                        self._queue_change(file_path)
-                        changes_detected = True
-                    else:
-                        cached_info = self.file_cache[file_path]
-                        if (file_info['mtime'] != cached_info['mtime'] or 
-                            file_info['size'] != cached_info['size']):
-                            # Modified file
-                            print(f"Modified file detected: {file_path}")
-                            self._queue_change(file_path)
-                            changes_detected = True
-                
-                # Check for deleted files
-                for file_path in list(self.file_cache.keys()):
-                    if file_path not in current_files:
-                        # Deleted file
-                        print(f"Deleted file detected: {file_path}")
-                        self._queue_change(file_path)
-                        changes_detected = True
-                
-                # Update cache
-                self.file_cache = current_files
+                current_set = set(zip(keys, mtimes, sizes))
+                
+                old_index = self._index
+                changed = current_set - self._cache_set
+                added = sum(1 for key, _, _ in changed if key not in old_index)
+                if not added and len(index) == len(old_index):
+                    # Same key count and nothing new means nothing was removed
+                    deleted = ()
+                else:
+                    # Key views support set difference without copying the keys
+                    deleted = old_index.keys() - index.keys()
+                debug = logger.isEnabledFor(logging.DEBUG)
+                
+                # Collect the directories of new, modified and deleted files
+                changed_dirs = set()
+                for key, _, _ in changed:
+                    if debug:
+                        kind = "Modified" if key in old_index else "New"
+                        logger.debug("%s file detected: %s", kind, self._full_path(key))
+                    changed_dirs.add(key[0])
+                
+                for key in deleted:
+                    if debug:
+                        logger.debug("Deleted file detected: %s", self._full_path(key))
+                    changed_dirs.add(key[0])
+                
+                for dir_id in changed_dirs:
+                    dir_path = self._dir_table[dir_id]
+                    root_path = self._find_root(dir_path)
+                    if root_path:
+                        common = changed_roots.get(root_path)
+                        changed_roots[root_path] = dir_path if common is None else os.path.commonpath((common, dir_path))
+                
+                changes_detected = bool(changed or deleted)
+                
+                # Swap in the new cache before publishing changed roots; only
+                # this thread reads it, so no lock is needed
+                self._keys, self._inodes, self._mtimes, self._sizes = keys, inodes, mtimes, sizes
+                self._index = index
+                self._cache_set = current_set
+                
+                # Directories that are gone no longer pin their table slots
+                self._prune_dir_table()
+                
+                for root_path, changed_path in changed_roots.items():
+                    self._put_change(root_path, changed_path)
                 
                 if changes_detected:
-                    print(f"Changes detected, scheduling batch update")
+                    logger.info("Changes detected (%d new or modified, %d deleted), scheduling batch update",
+                                len(changed), len(deleted))
+                    # Poll faster while the tree is busy
+                    poll_interval = max(self._min_interval, poll_interval // 2)
+                else:
+                    # Back off while the tree is idle
+                    poll_interval = min(self._max_interval, poll_interval * 2)
                 
-                # Sleep before next poll
-                for _ in range(poll_interval * 10):  # Check every 0.1 seconds if we should stop
-                    if not self.running:
-                        break
-                    time.sleep(0.1)
+                # Sleep before next poll, waking immediately on stop()
+                self._stop_event.wait(timeout=poll_interval)
                 
             except Exception as e:
-                print(f"Error in monitor loop: {e}")
-                time.sleep(poll_interval)
+                logger.error("Error in monitor loop: %s", e)
+                self._stop_event.wait(timeout=poll_interval)
         
-        print("FileMonitor loop ended")
+        logger.debug("FileMonitor loop ended")
     
-    def _queue_change(self, file_path):
-        """Queue file change for batched processing"""
-        # Find the root path this file belongs to
-        root_path = None
-        for path in self.paths:
-            if file_path.startswith(path):
-                root_path = path
-                break
+    @staticmethod
+    def _top_component(path):
+        """Return the first component of an absolute path ('' for /)"""
+        return path.split(os.sep, 2)[1] if path != os.sep else ''
+    
+    def _find_root(self, file_path):
+        """Find the deepest monitored root containing file_path"""
+        candidates = self._roots_by_top.get(self._top_component(file_path), [])
+        # A monitored filesystem root lands in the '' bucket
+        for path, prefix in candidates + self._roots_by_top.get('', []):
+            if file_path == path or file_path.startswith(prefix):
+                return path
+        return None
+    
+    def _queue_change(self, dir_path):
+        """Queue a change inside dir_path for batched processing"""
+        # Find the root path this directory belongs to
+        root_path = self._find_root(dir_path)
         
         if root_path:
-            self.pending_changes.add(root_path)
+            self._put_change(root_path, dir_path)
+    
+    def _put_change(self, root_path, changed_path):
+        """Hand a changed directory of a root to the callback worker"""
+        item = (root_path, changed_path, time.monotonic())
+        # Block while the queue is full, but never past stop()
+        while not self._stop_event.is_set():
+            try:
+                self._callback_queue.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+    
+    def _callback_worker(self):
+        """Call back once per root for all changes within batch_delay of its first change"""
+        # root path -> monotonic deadline of its open batch window
+        windows = {}
+        # root path -> deepest directory containing the changes of that window
+        changed = {}
+        
+        while True:
+            timeout = None
+            if windows:
+                timeout = max(0.0, min(windows.values()) - time.monotonic())
             
-            # Cancel existing timer and start new one
-            if self.batch_timer:
-                self.batch_timer.cancel()
+            try:
+                item = self._callback_queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
             
-            # Process changes after delay to batch multiple events
-            self.batch_timer = threading.Timer(5.0, self._process_batched_changes)
-            self.batch_timer.start()
-    
-    def _process_batched_changes(self):
-        """Process batched file changes"""
-        if self.pending_changes and self.callback:
-            print(f"Processing batched changes for {len(self.pending_changes)} paths")
+            if item is _STOP:
+                break
+            if item is not None:
+                root_path, changed_path, queued_at = item
+                windows.setdefault(root_path, queued_at + self.batch_delay)
+                common = changed.get(root_path)
+                changed[root_path] = changed_path if common is None else os.path.commonpath((common, changed_path))
             
-            # Process each changed root path
-            for root_path in self.pending_changes:
-                try:
-                    print(f"Calling callback for path: {root_path}")
-                    self.callback("BATCH_UPDATE", root_path)
-                except Exception as e:
-                    print(f"Error in callback for {root_path}: {e}")
+            now = time.monotonic()
+            due = [root_path for root_path, deadline in windows.items() if deadline <= now]
+            for root_path in due:
+                del windows[root_path]
+            due = [(root_path, changed.pop(root_path)) for root_path in due]
             
-            # Clear pending changes
-            self.pending_changes.clear()
-        
-        self.batch_timer = None
+            if due and self.callback:
+                logger.info("Processing batched changes for %d paths", len(due))
+                
+                for root_path, changed_path in due:
+                    try:
+                        logger.debug("Calling callback for path: %s (changes under %s)", root_path, changed_path)
+                        self.callback("BATCH_UPDATE", root_path, changed_path)
+                    except Exception as e:
+                        logger.error("Error in callback for %s: %s", root_path, e)
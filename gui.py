@@ -6,16 +6,115 @@ A simple GUI interface for the file search functionality
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
+from collections import OrderedDict
+import itertools
+import queue
 import threading
 import time
 import os
 import subprocess
-from main import FileSearchApp, FileIndexer
+import sqlite3
+from main import FileSearchApp, FileIndexer, SKIP_DIRS, clean_text, file_rows, path_bounds
+
+
+# SQL used in hot loops, kept as single constants so the connection's
+# statement cache always hits
+_SQL_INSERT_FILE = "INSERT INTO files (name, path, size, modified, indexed_at) VALUES (?, ?, ?, ?, ?)"
+_SQL_UPSERT_FILE = (_SQL_INSERT_FILE + " ON CONFLICT(path) DO UPDATE SET name = excluded.name,"
+                    " size = excluded.size, modified = excluded.modified, indexed_at = excluded.indexed_at")
+_SQL_DELETE_PATHS = "DELETE FROM files WHERE path IN (SELECT path FROM del_paths)"
+
+# (bytes per unit, suffix), largest first
+_SIZE_UNITS = ((1 << 30, 'GB'), (1 << 20, 'MB'), (1 << 10, 'KB'))
+
+
+def _delete_paths(conn, paths):
+    """Delete the files rows for paths with one statement, staged in a TEMP table"""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS del_paths (path TEXT PRIMARY KEY)")
+    conn.executemany("INSERT OR IGNORE INTO del_paths (path) VALUES (?)", ((p,) for p in paths))
+    conn.execute(_SQL_DELETE_PATHS)
+    conn.execute("DELETE FROM del_paths")
+
+
+def _drop_file_indexes(conn, with_triggers=False):
+    """Drop the secondary indexes on files (and its triggers), returning the SQL that recreates them"""
+    object_types = ('index', 'trigger') if with_triggers else ('index',)
+    # The UNIQUE path index has no SQL and is kept, upserts need it
+    saved = conn.execute(
+        f"SELECT type, name, sql FROM sqlite_master WHERE type IN ({', '.join('?' * len(object_types))}) "
+        "AND tbl_name = 'files' AND sql IS NOT NULL", object_types
+    ).fetchall()
+    for object_type, object_name, _ in saved:
+        conn.execute(f'DROP {object_type.upper()} "{object_name}"')
+    return [object_sql for _, _, object_sql in saved]
+
+
+def _optimize_connection(conn):
+    """Run PRAGMA optimize, skipping this round if a long write holds the lock"""
+    try:
+        conn.execute('PRAGMA optimize')
+    except sqlite3.OperationalError as ex:
+        # The next periodic run catches up once the lock is free
+        print(f"Skipped index optimize: {ex}")
+
+
+def _write_changes(conn, path, file_count, new_files, updated_files, deleted_files):
+    """Apply one incremental update of path to the database in a single transaction"""
+    if not (new_files or updated_files or deleted_files):
+        # Nothing changed, not even the file count; skip the commit and its sync
+        return
+    
+    current_time = int(time.time())
+    
+    # Take the write lock up front so the batch never fails half way through
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        
+        # Rebuilding the secondary indexes once beats updating them row by
+        # row only when the batch is large next to the table (measured at
+        # about twice its size); e.g. a big tree added to a small index
+        saved_indexes = []
+        written = len(new_files) + len(updated_files)
+        if written >= 10000:
+            (max_id,) = conn.execute("SELECT MAX(id) FROM files").fetchone()
+            if written > 2 * (max_id or 0):
+                saved_indexes = _drop_file_indexes(conn)
+        
+        # Add new files and update modified ones in a single upsert pass
+        if new_files or updated_files:
+            file_data = [(name, file_path, size, modified, current_time)
+                         for name, file_path, size, modified in itertools.chain(new_files, updated_files)]
+            conn.executemany(_SQL_UPSERT_FILE, file_data)
+        
+        for object_sql in saved_indexes:
+            conn.execute(object_sql)
+        
+        # Remove deleted files
+        if deleted_files:
+            _delete_paths(conn, deleted_files)
+        
+        # Update index_paths table
+        conn.execute('''
+            INSERT OR REPLACE INTO index_paths (path, last_indexed, file_count)
+            VALUES (?, ?, ?)
+        ''', (path, current_time, file_count))
 
 
 class FileSearchGUI:
     """GUI wrapper for the file search application"""
     
+    # Result rows inserted into the tree at a time, more load on scroll
+    RESULTS_PAGE_SIZE = 50
+    # Rows inserted per idle callback, so the event loop runs in between
+    RESULTS_CHUNK_SIZE = 20
+    # Recent search results kept, and for how many seconds
+    SEARCH_CACHE_SIZE = 64
+    SEARCH_CACHE_TTL = 60
+    # Seconds between status bar updates posted by worker threads
+    STATUS_INTERVAL = 0.25
+    # Milliseconds between PRAGMA optimize runs while monitoring updates the index
+    OPTIMIZE_INTERVAL = 15 * 60 * 1000
+    
     def __init__(self):
         self.root = tk.Tk(className="Filesearch")
         self.root.title("File Search - Linux")
@@ -24,10 +123,51 @@ class FileSearchGUI:
         self.app = FileSearchApp()
         self.search_thread = None
         self.file_monitor = None
+        # Bumped per search request, results from older searches are dropped
+        self._search_gen = 0
+        # (query, case_sensitive, limit, index version) -> (results, search_time, cached_at)
+        self._search_cache = OrderedDict()
+        # Bumped on every index mutation so cached results never outlive it
+        self._index_version = 0
+        # Periodic PRAGMA optimize job while monitoring is active
+        self._optimize_job = None
+        # Monitored root -> after() job that updates it once its changes go quiet
+        self._pending_updates = {}
+        # Monitored root -> deepest directory containing its pending changes
+        self._pending_subtrees = {}
+        # Full result list, how many rows of it are in the tree, how many
+        # should be, and the pending after_idle insert job
+        self._all_results = []
+        self._shown_results = 0
+        self._results_target = 0
+        self._insert_job = None
+        # Modification minute -> formatted time for the current results
+        self._mtime_strings = {}
+        # ('status', text) and ('call', function) messages from worker threads,
+        # handled in order on the main thread at most 10 times a second
+        self._progress_q = queue.SimpleQueue()
+        # Latest worker status not shown yet, and when one was last shown
+        self._pending_status = None
+        self._status_shown_at = 0.0
+        # Incremental updates are written by one thread with its own
+        # connection, so their transactions never block the UI
+        self._write_q = queue.Queue()
+        self._writer_thread = threading.Thread(target=self._queue_loop, args=(self._write_q,), daemon=True)
+        self._writer_thread.start()
+        # Incremental update scans run one after another on a persistent
+        # thread whose connection keeps its page cache between updates
+        self._update_q = queue.Queue()
+        self._update_thread = threading.Thread(target=self._queue_loop, args=(self._update_q,), daemon=True)
+        self._update_thread.start()
+        # Monitored root -> subtree of a queued automatic update that has not started yet
+        self._queued_updates = {}
+        self._queued_updates_lock = threading.Lock()
         
         self.setup_ui()
         self.bind_events()
         
+        self.root.after(100, self._drain_progress)
+        
         # Ask user if they want to build initial index
         self.root.after(100, self.prompt_initial_index)
         
@@ -79,6 +219,11 @@ class FileSearchGUI:
         )
         self.auto_monitor_btn.pack(side=tk.LEFT, padx=5)
         
+        # Whether indexing skips SKIP_DIRS (.git, node_modules, build output...)
+        self.skip_dirs_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(buttons_frame, text="Skip build folders",
+                       variable=self.skip_dirs_var).pack(side=tk.LEFT, padx=5)
+        
         # Status label
         self.status_var = tk.StringVar(value="Ready")
         self.status_label = ttk.Label(buttons_frame, textvariable=self.status_var)
@@ -112,13 +257,13 @@ class FileSearchGUI:
         self.results_tree.column('Path', width=400)
         
         # Scrollbars
-        v_scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.results_tree.yview)
+        self.results_scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.results_tree.yview)
         h_scrollbar = ttk.Scrollbar(results_frame, orient=tk.HORIZONTAL, command=self.results_tree.xview)
         
-        self.results_tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.results_tree.configure(yscrollcommand=self._on_results_scroll, xscrollcommand=h_scrollbar.set)
         
         # Pack scrollbars and treeview
-        v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.results_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
         self.results_tree.pack(fill=tk.BOTH, expand=True)
         
@@ -152,9 +297,66 @@ class FileSearchGUI:
                                   "This will help you search files faster."):
                 self.build_index()
         
+    def _drain_progress(self):
+        """Apply queued worker messages, setting only the latest status between calls"""
+        try:
+            status = self._pending_status
+            while True:
+                try:
+                    kind, value = self._progress_q.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == 'status':
+                    status = value
+                else:
+                    if status is not None:
+                        self._show_status(status)
+                        status = None
+                    try:
+                        value()
+                    except Exception as ex:
+                        # One failing handler must not hold back the messages after it
+                        print(f"Error handling worker message: {ex}")
+            
+            # Calls run every tick, but a stream of progress text only redraws
+            # the status bar once per STATUS_INTERVAL
+            if status is not None and time.monotonic() - self._status_shown_at >= self.STATUS_INTERVAL:
+                self._show_status(status)
+                status = None
+            self._pending_status = status
+        finally:
+            # Keep pumping even if showing a status failed
+            self.root.after(100, self._drain_progress)
+    
+    def _show_status(self, status):
+        """Show a worker status, skipping the redraw when the text is unchanged"""
+        self._status_shown_at = time.monotonic()
+        if status != self.status_var.get():
+            self.status_var.set(status)
+    
+    def _queue_loop(self, tasks):
+        """Run queued functions of this thread's own database connection until None"""
+        indexer = FileIndexer()
+        try:
+            while True:
+                task = tasks.get()
+                if task is None:
+                    break
+                try:
+                    task(indexer.conn)
+                except Exception as ex:
+                    # One failed task must not stop the thread, later tasks still need it
+                    print(f"Background task error: {ex}")
+                    if indexer.conn.in_transaction:
+                        indexer.conn.rollback()
+        finally:
+            indexer.close()
+    
     def on_search_change(self, *args):
         """Handle search text changes"""
         query = self.search_var.get().strip()
+        # Results of searches still running are stale now
+        self._search_gen += 1
         if len(query) >= 2:  # Start searching after 2 characters
             # Cancel any pending search
             if hasattr(self, 'search_after_id'):
@@ -166,35 +368,104 @@ class FileSearchGUI:
             self.clear_results()
     
     def perform_search(self, query):
-        """Perform search"""
-        try:
-            # Check if index exists
-            if not hasattr(self.app.indexer, 'conn') or self.app.indexer.conn is None:
-                self.status_var.set("No index found. Please build an index first.")
-                return
-                
-            self.status_var.set("Searching...")
-            
-            start_time = time.time()
-            results = self.app.indexer.search(query, 200, self.case_sensitive_var.get())
-            search_time = (time.time() - start_time) * 1000
+        """Perform search in a background thread"""
+        # Check if index exists
+        if not hasattr(self.app.indexer, 'conn') or self.app.indexer.conn is None:
+            self.status_var.set("No index found. Please build an index first.")
+            return
             
-            # Update results display
+        self.status_var.set("Searching...")
+        
+        self._search_gen += 1
+        gen = self._search_gen
+        case_sensitive = self.case_sensitive_var.get()
+        
+        key = (query, case_sensitive, 200, self._index_version)
+        cached = self._search_cache.get(key)
+        if cached and time.time() - cached[2] < self.SEARCH_CACHE_TTL:
+            self._search_cache.move_to_end(key)
+            self.update_results(cached[0], cached[1])
+            return
+        
+        def search_worker():
+            try:
+                # Create a new connection for this thread (SQLite threading requirement)
+                temp_indexer = FileIndexer()
+                try:
+                    start_time = time.time()
+                    results = temp_indexer.search(query, 200, case_sensitive)
+                    search_time = (time.time() - start_time) * 1000
+                finally:
+                    temp_indexer.close()
+                
+                # Tk may only be called from the main thread, which drains this queue
+                self._progress_q.put(('call', lambda: self._deliver_search_results(gen, key, results, search_time)))
+                
+            except Exception as ex:
+                error_msg = str(ex)
+                self._progress_q.put(('call', lambda: self._deliver_search_error(gen, error_msg)))
+        
+        self.search_thread = threading.Thread(target=search_worker, daemon=True)
+        self.search_thread.start()
+    
+    def _deliver_search_results(self, gen, key, results, search_time):
+        """Cache search results and show them unless a newer search has started (runs in main thread)"""
+        self._search_cache[key] = (results, search_time, time.time())
+        self._search_cache.move_to_end(key)
+        if len(self._search_cache) > self.SEARCH_CACHE_SIZE:
+            self._search_cache.popitem(last=False)
+        
+        if gen == self._search_gen:
             self.update_results(results, search_time)
-            
-        except Exception as ex:
-            messagebox.showerror("Search Error", str(ex))
+    
+    def _deliver_search_error(self, gen, error_msg):
+        """Report a search error unless a newer search has started (runs in main thread)"""
+        if gen == self._search_gen:
+            messagebox.showerror("Search Error", error_msg)
     
     def update_results(self, results, search_time):
         """Update results display"""
         # Clear existing results
-        for item in self.results_tree.get_children():
-            self.results_tree.delete(item)
+        self._reset_results()
+        
+        # Insert the first page only, the rest is loaded as the user scrolls
+        self._all_results = results
+        self._load_more_results()
         
-        # Add new results
-        for result in results:
+        # Update status
+        status = f"Found {len(results)} files ({search_time:.1f}ms)"
+        self.status_var.set(status)
+    
+    def _reset_results(self):
+        """Empty the results tree and stop any pending inserts"""
+        if self._insert_job:
+            self.root.after_cancel(self._insert_job)
+            self._insert_job = None
+        self.results_tree.delete(*self.results_tree.get_children())
+        self._all_results = []
+        self._shown_results = 0
+        self._results_target = 0
+        self._mtime_strings = {}
+    
+    def _load_more_results(self):
+        """Queue the next page of results for insertion into the tree"""
+        self._results_target = min(self._results_target + self.RESULTS_PAGE_SIZE, len(self._all_results))
+        if not self._insert_job:
+            self._insert_job = self.root.after_idle(self._insert_results_chunk)
+    
+    def _insert_results_chunk(self):
+        """Insert one chunk of queued results, re-posting itself until the page is in"""
+        start = self._shown_results
+        end = min(start + self.RESULTS_CHUNK_SIZE, self._results_target)
+        
+        mtime_strings = self._mtime_strings
+        for result in self._all_results[start:end]:
             size_str = self._format_size(result['size'])
-            mod_time = time.strftime('%Y-%m-%d %H:%M', time.localtime(result['modified']))
+            # Times are shown to the minute, so results in the same minute share one string
+            minute = result['modified'] // 60
+            mod_time = mtime_strings.get(minute)
+            if mod_time is None:
+                mod_time = mtime_strings[minute] = time.strftime('%Y-%m-%d %H:%M', time.localtime(minute * 60))
             
             self.results_tree.insert('', tk.END, values=(
                 result['name'],
@@ -203,20 +474,28 @@ class FileSearchGUI:
                 result['path']
             ))
         
-        # Update status
-        status = f"Found {len(results)} files ({search_time:.1f}ms)"
-        self.status_var.set(status)
+        self._shown_results = end
+        if end < self._results_target:
+            self._insert_job = self.root.after_idle(self._insert_results_chunk)
+        else:
+            self._insert_job = None
+    
+    def _on_results_scroll(self, first, last):
+        """Track the results scrollbar and load more rows near the bottom"""
+        self.results_scrollbar.set(first, last)
+        if float(last) >= 0.9 and self._results_target < len(self._all_results):
+            self._load_more_results()
     
     def _format_size(self, size_bytes):
         """Format file size"""
-        if size_bytes < 1024:
-            return f"{size_bytes}B"
-        elif size_bytes < 1024 * 1024:
-            return f"{size_bytes/1024:.1f}KB"
-        elif size_bytes < 1024 * 1024 * 1024:
-            return f"{size_bytes/(1024*1024):.1f}MB"
-        else:
-            return f"{size_bytes/(1024*1024*1024):.1f}GB"
+        for unit_size, suffix in _SIZE_UNITS:
+            if size_bytes >= unit_size:
+                return f"{size_bytes / unit_size:.1f}{suffix}"
+        return f"{size_bytes}B"
+    
+    def _skip_dirs(self):
+        """Directory names indexing should not descend into (read on the main thread)"""
+        return SKIP_DIRS if self.skip_dirs_var.get() else frozenset()
     
     def build_index(self):
         """Build file index"""
@@ -229,101 +508,103 @@ class FileSearchGUI:
             self.status_var.set("Building index...")
             
             print(f"Indexing files in {path}...")
+            skip_dirs = self._skip_dirs()
             
             def index_worker():
                 try:
-                    # Collect file information in background thread
-                    file_list = []
-                    import os
-                    from main import FileIndexer
+                    # Collect (names, dirs, dir_ids, sizes, mtimes) columns in background thread
+                    from main import scan_tree
+                    
+                    # Update status periodically
+                    def report(count):
+                        self._progress_q.put(('status', f"Indexing... {count} files found"))
                     
-                    # Walk through directory structure
-                    for root, dirs, files in os.walk(path):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                stat_info = os.stat(file_path)
-                                
-                                # Clean filename for database storage
-                                clean_name = file.encode('utf-8', errors='replace').decode('utf-8')
-                                clean_path = file_path.encode('utf-8', errors='replace').decode('utf-8')
-                                
-                                file_info = {
-                                    'name': clean_name,
-                                    'path': clean_path,
-                                    'size': stat_info.st_size,
-                                    'modified': int(stat_info.st_mtime)
-                                }
-                                file_list.append(file_info)
-                                
-                                # Update status periodically
-                                if len(file_list) % 1000 == 0:
-                                    self.root.after(0, lambda count=len(file_list): 
-                                                   self.status_var.set(f"Indexing... {count} files found"))
-                                    
-                            except (OSError, PermissionError):
-                                continue  # Skip files we can't access
+                    # Hidden files and directories are skipped, as in incremental updates
+                    columns = scan_tree(path, skip_hidden=True, skip_dirs=skip_dirs, progress_callback=report)
                     
                     # Now update the database in the main thread
-                    self.root.after(0, lambda: self.update_index_with_files(file_list, path))
+                    self._progress_q.put(('call', lambda: self.update_index_with_files(columns, path)))
                     
                 except Exception as ex:
                     error_msg = str(ex)
                     print(f"Index error: {error_msg}")
-                    self.root.after(0, lambda: self.handle_index_error(error_msg))
+                    self._progress_q.put(('call', lambda: self.handle_index_error(error_msg)))
             
             thread = threading.Thread(target=index_worker)
             thread.daemon = True
             thread.start()
     
-    def update_index_with_files(self, file_list, path):
-        """Update the index with collected files (runs in main thread)"""
+    def update_index_with_files(self, columns, path):
+        """Update the index with collected (names, dirs, dir_ids, sizes, mtimes) columns (runs in main thread)"""
+        self._index_version += 1
         try:
+            file_count = len(columns[0])
+            
             # Close existing indexer and create new one
             self.app.indexer.close()
             self.app.indexer = FileIndexer()
             
+            # Replace the index for this path in a single transaction
+            self.app.indexer.conn.execute("BEGIN IMMEDIATE")
+            
             # Clear existing index for this path
-            self.app.indexer.conn.execute("DELETE FROM files WHERE path LIKE ?", (path + "%",))
-            self.app.indexer.conn.commit()
+            self.app.indexer.conn.execute("DELETE FROM files WHERE path >= ? AND path < ?", path_bounds(path))
+            
+            # For large builds, drop the secondary indexes and FTS triggers and
+            # recreate them once after the inserts instead of updating them row by row
+            saved_indexes = []
+            if file_count >= 50000:
+                saved_indexes = _drop_file_indexes(self.app.indexer.conn, with_triggers=True)
             
             # Insert files in batches
             batch_size = 1000
             current_time = int(time.time())
             
-            for i in range(0, len(file_list), batch_size):
-                batch = file_list[i:i + batch_size]
-                file_data = [(f['name'], f['path'], f['size'], f['modified'], current_time) for f in batch]
+            rows = file_rows(columns)
+            for i in range(0, file_count, batch_size):
+                # Clean names for database storage
+                file_data = [
+                    (clean_text(name), clean_text(file_path), size, modified_time, current_time)
+                    for name, file_path, size, modified_time in itertools.islice(rows, batch_size)
+                ]
                 
-                self.app.indexer.conn.executemany(
-                    "INSERT INTO files (name, path, size, modified, indexed_at) VALUES (?, ?, ?, ?, ?)",
-                    file_data
-                )
-                self.app.indexer.conn.commit()
+                self.app.indexer.conn.executemany(_SQL_INSERT_FILE, file_data)
                 
                 # Update progress
-                progress = (i + len(batch)) / len(file_list) * 100
-                self.status_var.set(f"Indexing... {i + len(batch)}/{len(file_list)} files ({progress:.1f}%)")
+                done = i + len(file_data)
+                progress = done / file_count * 100
+                self.status_var.set(f"Indexing... {done}/{file_count} files ({progress:.1f}%)")
+                self.root.update_idletasks()
+            
+            if saved_indexes:
+                self.status_var.set("Rebuilding search indexes...")
                 self.root.update_idletasks()
+                for object_sql in saved_indexes:
+                    self.app.indexer.conn.execute(object_sql)
+                if self.app.indexer.fts_enabled:
+                    # The triggers missed the inserts, rebuild the name index in one pass
+                    self.app.indexer.conn.execute("INSERT INTO files_fts (files_fts) VALUES ('rebuild')")
             
             # Update index_paths table to record this indexing operation
             self.app.indexer.conn.execute('''
                 INSERT OR REPLACE INTO index_paths (path, last_indexed, file_count)
                 VALUES (?, ?, ?)
-            ''', (path, current_time, len(file_list)))
+            ''', (path, current_time, file_count))
             self.app.indexer.conn.commit()
             
             # Hide progress bar and show success
             self.progress_bar.stop()
             self.progress_bar.pack_forget()
-            self.status_var.set(f"Index built successfully - {len(file_list)} files indexed")
-            print(f"Index built successfully! Indexed {len(file_list)} files")
+            self.status_var.set(f"Index built successfully - {file_count} files indexed")
+            print(f"Index built successfully! Indexed {file_count} files")
             
             # Restart file monitoring for the new indexed path
             if self.auto_monitor_var.get():
                 self.root.after(1000, self.start_file_monitoring)
             
         except Exception as ex:
+            if self.app.indexer.conn.in_transaction:
+                self.app.indexer.conn.rollback()
             error_msg = str(ex)
             print(f"Index update error: {error_msg}")
             self.handle_index_error(error_msg)
@@ -452,160 +733,98 @@ class FileSearchGUI:
             self.status_var.set(f"Updating index for {path}...")
         
         print(f"Incrementally updating index for {path}...")
+        skip_dirs = self._skip_dirs()
         
-        def update_worker():
+        def update_worker(conn):
             try:
                 # Perform incremental update in background thread
-                import os
-                from main import FileIndexer
+                from main import scan_tree
                 
-                # Create a new connection for this thread (SQLite threading requirement)
-                temp_indexer = FileIndexer()
+                # Load the indexed modification times for this path once
+                cursor = conn.execute(
+                    "SELECT path, modified FROM files WHERE path >= ? AND path < ?", path_bounds(path)
+                )
+                # Paths left in it after the scan no longer exist on disk
+                snapshot = dict(cursor.fetchall())
+                
+                def report(count):
+                    self._progress_q.put(('status', f"Scanning... {count} files"))
+                
+                # Crawl the tree on a thread pool; hidden directories and files are skipped
+                columns = scan_tree(path, skip_hidden=True, skip_dirs=skip_dirs,
+                                    progress_callback=None if silent else report)
                 
                 # Collect information about changes
-                current_files = set()
+                file_count = len(columns[0])
                 new_files = []
                 updated_files = []
                 
-                for root, dirs, files in os.walk(path):
-                    # Skip hidden directories
-                    dirs[:] = [d for d in dirs if not d.startswith('.')]
+                for file, file_path, size, modified_time in file_rows(columns):
+                    clean_path = clean_text(file_path)
                     
-                    for file in files:
-                        if file.startswith('.'):
-                            continue
-                            
-                        try:
-                            file_path = os.path.join(root, file)
-                            current_files.add(file_path)
-                            
-                            stat_info = os.stat(file_path)
-                            modified_time = int(stat_info.st_mtime)
-                            
-                            # Clean filenames
-                            clean_name = file.encode('utf-8', errors='replace').decode('utf-8')
-                            clean_path = file_path.encode('utf-8', errors='replace').decode('utf-8')
-                            
-                            file_info = {
-                                'name': clean_name,
-                                'path': clean_path,
-                                'size': stat_info.st_size,
-                                'modified': modified_time
-                            }
-                            
-                            # Check if file exists in index (using thread-local connection)
-                            cursor = temp_indexer.conn.execute(
-                                "SELECT modified FROM files WHERE path = ?", (clean_path,)
-                            )
-                            existing = cursor.fetchone()
-                            
-                            if not existing:
-                                new_files.append(file_info)
-                            elif existing[0] != modified_time:
-                                updated_files.append(file_info)
-                                
-                            # Update status periodically
-                            total_processed = len(new_files) + len(updated_files)
-                            if not silent and total_processed % 500 == 0:
-                                self.root.after(0, lambda count=total_processed: 
-                                               self.status_var.set(f"Scanning... {count} changes found"))
-                                
-                        except (OSError, PermissionError):
-                            continue
+                    # Check if file exists in index; rows are only built for
+                    # changed files, as (name, path, size, modified) tuples
+                    indexed_time = snapshot.pop(clean_path, None)
+                    
+                    if indexed_time is None:
+                        new_files.append((clean_text(file), clean_path, size, modified_time))
+                    elif indexed_time != modified_time:
+                        updated_files.append((clean_text(file), clean_path, size, modified_time))
                 
-                # Close the temporary connection
-                temp_indexer.close()
+                # Whatever the scan did not find was deleted
+                deleted_files = list(snapshot)
                 
-                # Update the database in main thread
-                self.root.after(0, lambda: self._apply_incremental_changes(
-                    path, current_files, new_files, updated_files, silent))
+                # Update the database in the writer thread
+                self._write_q.put(lambda conn: self._apply_incremental_changes(
+                    conn, path, file_count, new_files, updated_files, deleted_files, silent))
                 
             except Exception as ex:
                 error_msg = str(ex)
                 print(f"Incremental update error: {error_msg}")
                 if not silent:
-                    self.root.after(0, lambda: self._handle_incremental_error(error_msg))
+                    self._progress_q.put(('call', lambda: self._handle_incremental_error(error_msg)))
         
-        thread = threading.Thread(target=update_worker)
-        thread.daemon = True
-        thread.start()
+        self._update_q.put(update_worker)
     
-    def _apply_incremental_changes(self, path, current_files, new_files, updated_files, silent=False):
-        """Apply incremental changes to the database (runs in main thread)"""
+    def _apply_incremental_changes(self, conn, path, file_count, new_files, updated_files, deleted_files, silent=False):
+        """Apply incremental changes to the database (runs in writer thread)"""
         try:
-            current_time = int(time.time())
-            
-            # Add new files
-            if new_files:
-                new_data = [(f['name'], f['path'], f['size'], f['modified'], current_time) for f in new_files]
-                self.app.indexer.conn.executemany(
-                    "INSERT INTO files (name, path, size, modified, indexed_at) VALUES (?, ?, ?, ?, ?)",
-                    new_data
-                )
-            
-            # Update modified files
-            if updated_files:
-                for f in updated_files:
-                    self.app.indexer.conn.execute('''
-                        UPDATE files SET name = ?, size = ?, modified = ?, indexed_at = ?
-                        WHERE path = ?
-                    ''', (f['name'], f['size'], f['modified'], current_time, f['path']))
-            
-            # Remove deleted files
-            cursor = self.app.indexer.conn.execute(
-                "SELECT path FROM files WHERE path LIKE ?", (path + "%",)
-            )
-            indexed_files = {row[0] for row in cursor.fetchall()}
-            deleted_files = indexed_files - current_files
-            
-            if deleted_files:
-                # Batch delete operations to avoid "too many SQL variables" error
-                batch_size = 500  # SQLite limit is usually 999, use 500 to be safe
-                deleted_files_list = list(deleted_files)
-                
-                for i in range(0, len(deleted_files_list), batch_size):
-                    batch = deleted_files_list[i:i + batch_size]
-                    placeholders = ",".join("?" * len(batch))
-                    self.app.indexer.conn.execute(
-                        f"DELETE FROM files WHERE path IN ({placeholders})",
-                        batch
-                    )
-                print(f"GUI: Removed {len(deleted_files)} deleted files from index")
-            
-            # Update index_paths table
-            self.app.indexer.conn.execute('''
-                INSERT OR REPLACE INTO index_paths (path, last_indexed, file_count)
-                VALUES (?, ?, ?)
-            ''', (path, current_time, len(current_files)))
-            
-            self.app.indexer.conn.commit()
-            
-            if not silent:
-                # Hide progress bar and show success
-                self.progress_bar.stop()
-                self.progress_bar.pack_forget()
-                
-                total_changes = len(new_files) + len(updated_files) + len(deleted_files)
-                message = (f"Incremental update complete for {os.path.basename(path)}:\n"
-                          f"New: {len(new_files)}, Updated: {len(updated_files)}, "
-                          f"Deleted: {len(deleted_files)}")
-                self.status_var.set(f"Update complete - {total_changes} changes")
-                print(message)
-            else:
-                # Silent mode - just update status briefly
-                total_changes = len(new_files) + len(updated_files) + len(deleted_files)
-                if total_changes > 0:
-                    self.status_var.set(f"Index updated - {total_changes} changes")
-                    # Clear status after a few seconds
-                    self.root.after(3000, lambda: self.status_var.set("Ready"))
-                else:
-                    self.status_var.set("Ready")
-            
+            _write_changes(conn, path, file_count, new_files, updated_files, deleted_files)
         except Exception as ex:
             error_msg = str(ex)
             print(f"Apply changes error: {error_msg}")
             if not silent:
-                self._handle_incremental_error(error_msg)
+                self._progress_q.put(('call', lambda: self._handle_incremental_error(error_msg)))
+            return
+        
+        if deleted_files:
+            print(f"GUI: Removed {len(deleted_files)} deleted files from index")
+        self._progress_q.put(('call', lambda: self._finish_incremental_update(
+            path, new_files, updated_files, deleted_files, silent)))
+    
+    def _finish_incremental_update(self, path, new_files, updated_files, deleted_files, silent):
+        """Report an applied incremental update (runs in main thread)"""
+        self._index_version += 1
+        if not silent:
+            # Hide progress bar and show success
+            self.progress_bar.stop()
+            self.progress_bar.pack_forget()
+            
+            total_changes = len(new_files) + len(updated_files) + len(deleted_files)
+            message = (f"Incremental update complete for {os.path.basename(path)}:\n"
+                      f"New: {len(new_files)}, Updated: {len(updated_files)}, "
+                      f"Deleted: {len(deleted_files)}")
+            self.status_var.set(f"Update complete - {total_changes} changes")
+            print(message)
+        else:
+            # Silent mode - just update status briefly
+            total_changes = len(new_files) + len(updated_files) + len(deleted_files)
+            if total_changes > 0:
+                self.status_var.set(f"Index updated - {total_changes} changes")
+                # Clear status after a few seconds
+                self.root.after(3000, lambda: self.status_var.set("Ready"))
+            else:
+                self.status_var.set("Ready")
     
     def _handle_incremental_error(self, error_msg):
         """Handle incremental update errors"""
@@ -635,8 +854,7 @@ class FileSearchGUI:
 
     def clear_results(self):
         """Clear search results"""
-        for item in self.results_tree.get_children():
-            self.results_tree.delete(item)
+        self._reset_results()
         self.status_var.set("Ready")
     
     def show_context_menu(self, event):
@@ -695,19 +913,21 @@ class FileSearchGUI:
                 paths_to_monitor = [path for path, _, _ in indexed_paths]
                 
                 # Set up monitoring callback
-                def on_file_change(event_type, file_path):
+                def on_file_change(event_type, root_path, changed_path):
                     """Handle file system events"""
                     if event_type == "BATCH_UPDATE":
-                        # Schedule incremental update on main thread
-                        self.root.after(0, lambda: self._handle_file_change_batch(file_path))
+                        # Coalesce with other pending changes on main thread
+                        self._progress_q.put(('call', lambda: self._queue_file_change_batch(root_path, changed_path)))
                 
                 # Start monitoring
-                self.file_monitor = FileMonitor(paths_to_monitor, on_file_change)
+                self.file_monitor = FileMonitor(paths_to_monitor, on_file_change, skip_dirs=self._skip_dirs())
                 
                 if self.file_monitor.start():
                     print(f"Started automatic monitoring of {len(paths_to_monitor)} indexed paths")
                     self.status_var.set(f"Auto-monitoring {len(paths_to_monitor)} paths")
                     self.update_monitor_indicator(True)
+                    if self._optimize_job is None:
+                        self._optimize_job = self.root.after(self.OPTIMIZE_INTERVAL, self._optimize_index)
                 else:
                     print("Failed to start file monitoring")
                     self.file_monitor = None
@@ -718,167 +938,171 @@ class FileSearchGUI:
         except Exception as ex:
             print(f"Failed to start file monitoring: {ex}")
     
-    def _handle_file_change_batch(self, root_path):
+    def _queue_file_change_batch(self, root_path, changed_path, delay=2000):
+        """Restart the quiet period of a changed root before updating it"""
+        job = self._pending_updates.get(root_path)
+        if job:
+            self.root.after_cancel(job)
+        # Only the deepest directory holding every pending change is rescanned
+        subtree = self._pending_subtrees.get(root_path)
+        self._pending_subtrees[root_path] = (changed_path if subtree is None
+                                             else os.path.commonpath((subtree, changed_path)))
+        # One update per root once no changes arrived for it during the delay
+        self._pending_updates[root_path] = self.root.after(delay, lambda: self._run_pending_update(root_path))
+    
+    def _run_pending_update(self, root_path):
+        """Update a root whose burst of changes has ended"""
+        self._pending_updates.pop(root_path, None)
+        self._handle_file_change_batch(root_path, self._pending_subtrees.pop(root_path, root_path))
+    
+    def _handle_file_change_batch(self, root_path, changed_path):
         """Handle batched file system change events"""
+        self._index_version += 1
         try:
             print(f"Processing automatic incremental update for: {root_path}")
             
             # Only update if no indexing operation is currently running
             if hasattr(self, 'progress_bar') and self.progress_bar.winfo_viewable():
                 print("Skipping automatic update - manual operation in progress")
-                # Reschedule after current operation
-                self.root.after(10000, lambda: self._handle_file_change_batch(root_path))
+                # Reschedule after current operation, coalesced with any newer changes
+                self._queue_file_change_batch(root_path, changed_path, delay=10000)
                 return
             
             # Perform incremental update
-            self._perform_automatic_incremental_update(root_path)
+            self._perform_automatic_incremental_update(root_path, changed_path)
                     
         except Exception as ex:
             print(f"Error handling file change batch: {ex}")
     
-    def _perform_automatic_incremental_update(self, path):
+    def _perform_automatic_incremental_update(self, path, changed_path=None):
         """Perform automatic incremental update (less intrusive than manual update)"""
+        # Only rescan the subtree of path that changed, all of it by default
+        skip_dirs = self._skip_dirs()
+        subtree = self._update_subtree(path, changed_path or path, skip_dirs)
+        
+        with self._queued_updates_lock:
+            queued = self._queued_updates.get(path)
+            if queued is not None:
+                # An update of this root is still waiting, widen it instead
+                self._queued_updates[path] = os.path.commonpath((queued, subtree))
+                return
+            self._queued_updates[path] = subtree
+        
         # Don't show progress bar for automatic updates to avoid interrupting user
-        print(f"Auto-updating index for {path}...")
+        print(f"Auto-updating index for {subtree}...")
         
         # Store original status
         original_status = self.status_var.get()
         self.status_var.set(f"Auto-updating index...")
         
-        def update_worker():
+        def update_worker(conn):
+            with self._queued_updates_lock:
+                subtree = self._queued_updates.pop(path)
             try:
                 # Perform incremental update in background thread
-                import os
-                from main import FileIndexer
+                from main import scan_tree
                 
-                # Create a new connection for this thread (SQLite threading requirement)
-                temp_indexer = FileIndexer()
+                # Load the indexed modification times for this subtree once
+                cursor = conn.execute(
+                    "SELECT path, modified FROM files WHERE path >= ? AND path < ?", path_bounds(subtree)
+                )
+                # Paths left in it after the scan no longer exist on disk
+                snapshot = dict(cursor.fetchall())
+                
+                # Crawl the subtree on a thread pool; hidden directories and files are skipped
+                columns = scan_tree(subtree, skip_hidden=True, skip_dirs=skip_dirs)
                 
                 # Collect information about changes
-                current_files = set()
+                file_count = len(columns[0])
+                if subtree != path:
+                    # The rest of the root is unchanged, adjust its stored count
+                    cursor = conn.execute(
+                        "SELECT file_count FROM index_paths WHERE path = ?", (path,)
+                    )
+                    row = cursor.fetchone()
+                    file_count = (row[0] if row else 0) - len(snapshot) + file_count
                 new_files = []
                 updated_files = []
                 
-                for root, dirs, files in os.walk(path):
-                    # Skip hidden directories
-                    dirs[:] = [d for d in dirs if not d.startswith('.')]
+                for file, file_path, size, modified_time in file_rows(columns):
+                    clean_path = clean_text(file_path)
+                    
+                    # Check if file exists in index; rows are only built for
+                    # changed files, as (name, path, size, modified) tuples
+                    indexed_time = snapshot.pop(clean_path, None)
                     
-                    for file in files:
-                        if file.startswith('.'):
-                            continue
-                            
-                        try:
-                            file_path = os.path.join(root, file)
-                            current_files.add(file_path)
-                            
-                            stat_info = os.stat(file_path)
-                            modified_time = int(stat_info.st_mtime)
-                            
-                            # Clean filenames
-                            clean_name = file.encode('utf-8', errors='replace').decode('utf-8')
-                            clean_path = file_path.encode('utf-8', errors='replace').decode('utf-8')
-                            
-                            file_info = {
-                                'name': clean_name,
-                                'path': clean_path,
-                                'size': stat_info.st_size,
-                                'modified': modified_time
-                            }
-                            
-                            # Check if file exists in index (using thread-local connection)
-                            cursor = temp_indexer.conn.execute(
-                                "SELECT modified FROM files WHERE path = ?", (clean_path,)
-                            )
-                            existing = cursor.fetchone()
-                            
-                            if not existing:
-                                new_files.append(file_info)
-                            elif existing[0] != modified_time:
-                                updated_files.append(file_info)
-                                
-                        except (OSError, PermissionError):
-                            continue
+                    if indexed_time is None:
+                        new_files.append((clean_text(file), clean_path, size, modified_time))
+                    elif indexed_time != modified_time:
+                        updated_files.append((clean_text(file), clean_path, size, modified_time))
                 
-                # Close the temporary connection
-                temp_indexer.close()
+                # Whatever the scan did not find was deleted
+                deleted_files = list(snapshot)
                 
-                # Update the database in main thread
-                self.root.after(0, lambda: self._apply_automatic_incremental_changes(
-                    path, current_files, new_files, updated_files, original_status))
+                # Update the database in the writer thread
+                self._write_q.put(lambda conn: self._apply_automatic_incremental_changes(
+                    conn, path, file_count, new_files, updated_files, deleted_files, original_status))
                 
             except Exception as ex:
                 error_msg = str(ex)
                 print(f"Automatic incremental update error: {error_msg}")
-                self.root.after(0, lambda: self.status_var.set(original_status))
+                self._progress_q.put(('status', original_status))
         
-        thread = threading.Thread(target=update_worker)
-        thread.daemon = True
-        thread.start()
+        self._update_q.put(update_worker)
     
-    def _apply_automatic_incremental_changes(self, path, current_files, new_files, updated_files, original_status):
-        """Apply automatic incremental changes to the database (runs in main thread)"""
+    def _update_subtree(self, root_path, changed_path, skip_dirs):
+        """Return the directory to rescan for changes under changed_path"""
+        # Hidden and skipped directories are never indexed, so stop at the
+        # nearest ancestor a full index scan would descend into
+        relative = os.path.relpath(changed_path, root_path)
+        if relative == os.curdir or relative.startswith(os.pardir):
+            return root_path
+        subtree = root_path
+        for part in relative.split(os.sep):
+            if part.startswith('.') or part in skip_dirs:
+                break
+            subtree = os.path.join(subtree, part)
+        return subtree
+    
+    def _apply_automatic_incremental_changes(self, conn, path, file_count, new_files, updated_files, deleted_files, original_status):
+        """Apply automatic incremental changes to the database (runs in writer thread)"""
         try:
-            current_time = int(time.time())
-            
-            # Add new files
-            if new_files:
-                new_data = [(f['name'], f['path'], f['size'], f['modified'], current_time) for f in new_files]
-                self.app.indexer.conn.executemany(
-                    "INSERT INTO files (name, path, size, modified, indexed_at) VALUES (?, ?, ?, ?, ?)",
-                    new_data
-                )
-            
-            # Update modified files
-            if updated_files:
-                for f in updated_files:
-                    self.app.indexer.conn.execute('''
-                        UPDATE files SET name = ?, size = ?, modified = ?, indexed_at = ?
-                        WHERE path = ?
-                    ''', (f['name'], f['size'], f['modified'], current_time, f['path']))
-            
-            # Remove deleted files
-            cursor = self.app.indexer.conn.execute(
-                "SELECT path FROM files WHERE path LIKE ?", (path + "%",)
-            )
-            indexed_files = {row[0] for row in cursor.fetchall()}
-            deleted_files = indexed_files - current_files
-            
-            if deleted_files:
-                placeholders = ",".join("?" * len(deleted_files))
-                self.app.indexer.conn.execute(
-                    f"DELETE FROM files WHERE path IN ({placeholders})",
-                    list(deleted_files)
-                )
-            
-            # Update index_paths table
-            self.app.indexer.conn.execute('''
-                INSERT OR REPLACE INTO index_paths (path, last_indexed, file_count)
-                VALUES (?, ?, ?)
-            ''', (path, current_time, len(current_files)))
-            
-            self.app.indexer.conn.commit()
-            
-            total_changes = len(new_files) + len(updated_files) + len(deleted_files)
-            
-            if total_changes > 0:
-                message = (f"Auto-updated {os.path.basename(path)}: "
-                          f"{len(new_files)} new, {len(updated_files)} modified, "
-                          f"{len(deleted_files)} deleted")
-                print(message)
-                
-                # Show brief notification in status
-                self.status_var.set(f"Auto-updated: {total_changes} changes")
-                # Restore original status after 3 seconds
-                self.root.after(3000, lambda: self.status_var.set(original_status))
-            else:
-                print(f"Auto-update completed for {path} - no changes detected")
-                self.status_var.set(original_status)
-            
+            _write_changes(conn, path, file_count, new_files, updated_files, deleted_files)
         except Exception as ex:
             error_msg = str(ex)
             print(f"Error applying automatic incremental changes: {error_msg}")
+            self._progress_q.put(('status', original_status))
+            return
+        
+        self._progress_q.put(('call', lambda: self._finish_automatic_incremental_update(
+            path, new_files, updated_files, deleted_files, original_status)))
+    
+    def _finish_automatic_incremental_update(self, path, new_files, updated_files, deleted_files, original_status):
+        """Report an applied automatic incremental update (runs in main thread)"""
+        self._index_version += 1
+        total_changes = len(new_files) + len(updated_files) + len(deleted_files)
+        
+        if total_changes > 0:
+            message = (f"Auto-updated {os.path.basename(path)}: "
+                      f"{len(new_files)} new, {len(updated_files)} modified, "
+                      f"{len(deleted_files)} deleted")
+            print(message)
+            
+            # Show brief notification in status
+            self.status_var.set(f"Auto-updated: {total_changes} changes")
+            # Restore original status after 3 seconds
+            self.root.after(3000, lambda: self.status_var.set(original_status))
+        else:
+            print(f"Auto-update completed for {path} - no changes detected")
             self.status_var.set(original_status)
     
+    def _optimize_index(self):
+        """Refresh query planner statistics while monitoring keeps changing the index"""
+        self._optimize_job = None
+        if self.file_monitor:
+            self._write_q.put(_optimize_connection)
+            self._optimize_job = self.root.after(self.OPTIMIZE_INTERVAL, self._optimize_index)
+    
     def stop_file_monitoring(self):
         """Stop file monitoring"""
         if self.file_monitor:
@@ -896,6 +1120,11 @@ class FileSearchGUI:
             self.root.mainloop()
         finally:
             self.stop_file_monitoring()
+            # Stop the update thread without waiting on a long scan, but let
+            # queued index writes finish
+            self._update_q.put(None)
+            self._write_q.put(None)
+            self._writer_thread.join()
             if hasattr(self.app, 'cleanup'):
                 self.app.cleanup()
 
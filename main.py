@@ -9,11 +9,13 @@ import sys
 import time
 import sqlite3
 import argparse
+from array import array
 from pathlib import Path
 from typing import List, Dict, Optional
 import fnmatch
 import threading
-from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 # Try to import file monitoring
 try:
@@ -23,16 +25,210 @@ except ImportError:
     MONITORING_AVAILABLE = False
 
 
+# Directories whose contents are rarely searched for but often hold most of a tree's files
+SKIP_DIRS = frozenset(['.git', 'node_modules', '__pycache__', '.venv', '.cache', 'target', 'build', 'dist'])
+
+
+def clean_text(text: str) -> str:
+    """
+    Return a file name or path as valid UTF-8 text for database storage
+    
+    ASCII names, the common case, are returned as is; otherwise the raw
+    bytes are decoded once with undecodable bytes replaced.
+    """
+    if text.isascii():
+        return text
+    return os.fsencode(text).decode('utf-8', errors='replace')
+
+
+def path_bounds(root_path: str):
+    """
+    Return (low, high) so that low <= path < high selects the paths under root_path
+    
+    Unlike LIKE 'root%', the range is answered from the path index even with
+    case-insensitive LIKE, and does not match sibling directories that
+    merely share the prefix (/data vs /data2).
+    """
+    prefix = root_path.rstrip(os.sep)
+    return prefix + os.sep, prefix + chr(ord(os.sep) + 1)
+
+
+def _scan_dirs(dir_paths: List[str], skip_hidden: bool, skip_dirs: frozenset, report=None, subdirs=None):
+    """
+    Return (names, dirs, dir_ids, sizes, mtimes) columns for the files under dir_paths
+    
+    Each directory is opened once; its entries are read with scandir on the
+    directory fd (d_type tells files from directories without a stat) and
+    files are stat'ed relative to that fd. When subdirs is a list, child
+    directories are collected there instead of being descended into.
+    report(n) is called with the number of files found in each directory.
+    """
+    names = []
+    dirs = []
+    dir_ids = array('I')
+    sizes = array('q')
+    mtimes = array('q')
+    add_name = names.append
+    add_dir_id = dir_ids.append
+    add_size = sizes.append
+    add_mtime = mtimes.append
+    sep = os.sep
+    stack = list(dir_paths)
+    add_dir = stack.append if subdirs is None else subdirs.append
+    
+    while stack:
+        dir_path = stack.pop()
+        try:
+            dir_fd = os.open(dir_path, os.O_RDONLY | os.O_DIRECTORY)
+        except OSError:
+            continue
+        
+        # Paths are built by concatenation, os.path.join costs more than
+        # the rest of the per-file work
+        prefix = dir_path if dir_path.endswith(sep) else dir_path + sep
+        dir_id = len(dirs)
+        found = len(names)
+        try:
+            with os.scandir(dir_fd) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if skip_hidden and name.startswith('.'):
+                        continue
+                    try:
+                        if entry.is_dir():
+                            # Like os.walk, symlinked directories are not descended into
+                            if name not in skip_dirs and not entry.is_symlink():
+                                add_dir(prefix + name)
+                            continue
+                        stat_info = entry.stat()
+                    except OSError:
+                        continue  # Skip files we can't access
+                    
+                    add_name(name)
+                    add_dir_id(dir_id)
+                    add_size(stat_info.st_size)
+                    # Whole seconds straight from the integer nanoseconds, no float
+                    add_mtime(stat_info.st_mtime_ns // 1000000000)
+        except OSError:
+            pass
+        finally:
+            os.close(dir_fd)
+        
+        if len(names) > found:
+            dirs.append(prefix)
+            if report:
+                report(len(names) - found)
+    
+    return names, dirs, dir_ids, sizes, mtimes
+
+
+def file_rows(columns):
+    """Iterate (name, path, size, modified) rows over scan columns, building each path on the fly"""
+    names, dirs, dir_ids, sizes, mtimes = columns
+    return zip(names, map(str.__add__, map(dirs.__getitem__, dir_ids), names), sizes, mtimes)
+
+
+def iter_tree(root_path: str, skip_hidden: bool = False, skip_dirs: frozenset = frozenset(),
+              progress_callback=None):
+    """
+    Yield (names, dirs, dir_ids, sizes, mtimes) column chunks for the files under root_path
+    
+    Each file is stored as its name plus the index of its directory in dirs
+    (a path prefix ending in os.sep), so the full path string is not kept per
+    file; file_rows() rebuilds paths while iterating. dir_ids, sizes and
+    mtimes are arrays rather than per-file tuples or dicts, keeping a large
+    crawl compact. The crawl is breadth-first over a
+    thread pool: every directory is scanned by a pool thread and the
+    subdirectories it finds are submitted as new tasks, so directory and
+    inode reads overlap even when one subtree holds most of the files.
+    A chunk is yielded as soon as its directories are scanned, while the
+    pool keeps crawling, so the caller can consume results alongside the walk.
+    Directories named in skip_dirs are not descended into.
+    progress_callback(count) is called with the running total of files found,
+    about every 1000 files.
+    """
+    report = None
+    if progress_callback:
+        lock = threading.Lock()
+        found = [0]
+        
+        def report(count):
+            with lock:
+                previous = found[0]
+                found[0] = total = previous + count
+            if total // 1000 != previous // 1000:
+                progress_callback(total)
+    
+    def scan_dirs(dir_paths):
+        subdirs = []
+        return _scan_dirs(dir_paths, skip_hidden, skip_dirs, report, subdirs=subdirs), subdirs
+    
+    # Directory scans wait on the kernel, not the CPU, so use more threads than cores
+    workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(scan_dirs, [root_path])}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                columns, subdirs = future.result()
+                # Hand the next level out in a few directories per task, enough
+                # to keep every thread busy without one future per directory
+                step = min(64, -(-len(subdirs) // workers)) or 1
+                for i in range(0, len(subdirs), step):
+                    pending.add(executor.submit(scan_dirs, subdirs[i:i + step]))
+                yield columns
+
+
+def scan_tree(root_path: str, skip_hidden: bool = False, skip_dirs: frozenset = frozenset(),
+              progress_callback=None):
+    """Return parallel (names, dirs, dir_ids, sizes, mtimes) columns for every file under root_path"""
+    names = []
+    dirs = []
+    dir_ids = array('I')
+    sizes = array('q')
+    mtimes = array('q')
+    
+    for sub_names, sub_dirs, sub_dir_ids, sub_sizes, sub_mtimes in iter_tree(
+            root_path, skip_hidden, skip_dirs, progress_callback):
+        names.extend(sub_names)
+        # Chunk directory ids are local to the chunk, shift them past ours
+        dir_ids.extend(map(len(dirs).__add__, sub_dir_ids))
+        dirs.extend(sub_dirs)
+        sizes.extend(sub_sizes)
+        mtimes.extend(sub_mtimes)
+    
+    return names, dirs, dir_ids, sizes, mtimes
+
+
 class FileIndexer:
     """Handles file indexing and database operations"""
     
+    SEARCH_CACHE_SIZE = 128
+    # Larger result sets are not worth keeping in memory
+    SEARCH_CACHE_MAX_LIMIT = 500
+    
     def __init__(self, db_path: str = "~/.filesearch.db"):
         self.db_path = os.path.expanduser(db_path)
+        # (query, limit, case_sensitive) -> result rows, valid while the database is unchanged
+        self._search_cache = OrderedDict()
+        self._search_cache_state = None
         self.init_database()
         
     def init_database(self):
         """Initialize SQLite database for file storage"""
-        self.conn = sqlite3.connect(self.db_path)
+        # Larger statement cache so the hot insert/update/delete statements stay compiled
+        self.conn = sqlite3.connect(self.db_path, cached_statements=256)
+        # WAL with synchronous=NORMAL only syncs at checkpoints instead of on
+        # every commit; keep temp storage and a larger page cache in memory
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA temp_store=MEMORY')
+        self.conn.execute('PRAGMA cache_size=-262144')
+        self.conn.execute('PRAGMA mmap_size=268435456')
+        # Wait for another writer (e.g. the CLI) instead of failing straight away
+        self.conn.execute('PRAGMA busy_timeout=5000')
+        # INSERT OR REPLACE must fire the delete trigger that keeps files_fts in sync
+        self.conn.execute('PRAGMA recursive_triggers=ON')
         self.conn.execute('''
             CREATE TABLE IF NOT EXISTS files (
                 id INTEGER PRIMARY KEY,
@@ -53,89 +249,96 @@ class FileIndexer:
             )
         ''')
         self.conn.execute('CREATE INDEX IF NOT EXISTS idx_name ON files(name)')
-        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_path ON files(path)')
-        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_indexed_paths ON index_paths(path)')
+        # LIKE ignores case, so it can only range-scan an index built with NOCASE
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_name_nocase ON files(name COLLATE NOCASE)')
+        # The UNIQUE constraints already index both path columns; drop the
+        # duplicate indexes older databases were created with
+        self.conn.execute('DROP INDEX IF EXISTS idx_path')
+        self.conn.execute('DROP INDEX IF EXISTS idx_indexed_paths')
+        self.fts_enabled = self._init_fts()
         self.conn.commit()
     
-    def _safe_encode_string(self, s: str) -> str:
-        """Safely encode string to handle Unicode issues"""
+    def _init_fts(self) -> bool:
+        """Create the trigram FTS5 index over file names, if SQLite supports it"""
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'files_fts'"
+        ).fetchone()
         try:
-            # Try to encode and decode to catch surrogate issues
-            s.encode('utf-8')
-            return s
-        except UnicodeEncodeError:
-            # Replace problematic characters with replacement character
-            return s.encode('utf-8', errors='replace').decode('utf-8')
-        except UnicodeDecodeError:
-            # Handle decode errors
-            return repr(s)[1:-1]  # Remove quotes from repr
+            self.conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS files_fts
+                USING fts5(name, content='files', content_rowid='id', tokenize='trigram')
+            ''')
+        except sqlite3.OperationalError:
+            # No FTS5 or no trigram tokenizer (SQLite < 3.34), search falls back to LIKE
+            return False
+        
+        # Mirror every change to files into the external-content index
+        self.conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS files_fts_insert AFTER INSERT ON files BEGIN
+                INSERT INTO files_fts (rowid, name) VALUES (new.id, new.name);
+            END
+        ''')
+        self.conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS files_fts_delete AFTER DELETE ON files BEGIN
+                INSERT INTO files_fts (files_fts, rowid, name) VALUES ('delete', old.id, old.name);
+            END
+        ''')
+        self.conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS files_fts_update AFTER UPDATE OF name ON files BEGIN
+                INSERT INTO files_fts (files_fts, rowid, name) VALUES ('delete', old.id, old.name);
+                INSERT INTO files_fts (rowid, name) VALUES (new.id, new.name);
+            END
+        ''')
+        
+        if not exists:
+            # Index the files already in an existing database
+            self.conn.execute("INSERT INTO files_fts (files_fts) VALUES ('rebuild')")
+        return True
     
     def index_directory(self, root_path: str, progress_callback=None):
         """Index all files in a directory tree"""
         print(f"Indexing files in {root_path}...")
         
-        # Clear existing entries for this path
-        self.conn.execute('DELETE FROM files WHERE path LIKE ?', (f"{root_path}%",))
-        
         files_indexed = 0
-        batch_size = 1000
-        batch = []
+        # One timestamp for the whole run instead of a time() call per file
+        current_time = int(time.time())
         
-        for root, dirs, files in os.walk(root_path):
-            # Skip hidden directories
-            dirs[:] = [d for d in dirs if not d.startswith('.')]
-            
-            for file in files:
-                if file.startswith('.'):
-                    continue
-                    
-                file_path = os.path.join(root, file)
-                try:
-                    stat = os.stat(file_path)
-                    
-                    # Handle Unicode encoding issues with filenames
-                    safe_filename = self._safe_encode_string(file)
-                    safe_filepath = self._safe_encode_string(file_path)
-                    
-                    batch.append((
-                        safe_filename,
-                        safe_filepath,
-                        stat.st_size,
-                        int(stat.st_mtime),
-                        int(time.time())
-                    ))
-                    
-                    if len(batch) >= batch_size:
-                        self._insert_batch(batch)
-                        batch = []
-                        files_indexed += batch_size
-                        
-                        if progress_callback:
-                            progress_callback(files_indexed)
-                            
-                except (OSError, PermissionError, UnicodeDecodeError, UnicodeEncodeError):
-                    continue
+        def chunk_rows(columns):
+            """Yield the insert row for each file in a scan chunk"""
+            for file, file_path, size, modified_time in file_rows(columns):
+                # clean_text replaces undecodable bytes, it never raises
+                yield (clean_text(file), clean_text(file_path), size, modified_time, current_time)
         
-        # Insert remaining files
-        if batch:
-            self._insert_batch(batch)
-            files_indexed += len(batch)
+        try:
+            # Replace the index for this path in one transaction, committed
+            # once at the end instead of once per batch
+            with self.conn:
+                self.conn.execute('BEGIN IMMEDIATE')
+                
+                # Clear existing entries for this path
+                self.conn.execute('DELETE FROM files WHERE path >= ? AND path < ?', path_bounds(root_path))
+                
+                # The pool crawls ahead while this thread writes each chunk;
+                # executemany pulls the rows one by one, no batch list is built
+                # SKIP_DIRS is skipped as in the GUI, which shares this database
+                for columns in iter_tree(root_path, skip_hidden=True, skip_dirs=SKIP_DIRS):
+                    previous = files_indexed
+                    files_indexed += self._insert_batch(chunk_rows(columns))
+                    if progress_callback and files_indexed // 10000 != previous // 10000:
+                        progress_callback(files_indexed)
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            return 0
         
         print(f"Indexed {files_indexed} files")
         return files_indexed
     
     def _insert_batch(self, batch):
-        """Insert a batch of files into database"""
-        try:
-            self.conn.executemany(
-                'INSERT OR REPLACE INTO files (name, path, size, modified, indexed_at) VALUES (?, ?, ?, ?, ?)',
-                batch
-            )
-            self.conn.commit()
-        except sqlite3.Error as e:
-            print(f"Database error: {e}")
-            # Try to commit what we can
-            self.conn.rollback()
+        """Insert an iterable of file rows inside the caller's transaction, returning the row count"""
+        return self.conn.executemany(
+            'INSERT OR REPLACE INTO files (name, path, size, modified, indexed_at) VALUES (?, ?, ?, ?, ?)',
+            batch
+        ).rowcount
     
     def incremental_index_directory(self, root_path: str, progress_callback=None):
         """Incrementally index a directory - only update changed files"""
@@ -155,113 +358,74 @@ class FileIndexer:
         else:
             print("First time indexing this directory")
             
-        # Track current files for deletion detection
-        current_files = set()
-        new_files = 0
-        updated_files = 0
-        skipped_files = 0
-        
-        # Walk through directory
-        for root, dirs, files in os.walk(root_path):
-            # Skip hidden directories
-            dirs[:] = [d for d in dirs if not d.startswith('.')]
+        bounds = path_bounds(root_path)
+        scanned = 0
+        
+        def scan_rows():
+            """Yield a (path, name, size, modified) row per file, reporting progress"""
+            nonlocal scanned
+            # Same exclusions as the full index and the GUI, or each would undo the other
+            for columns in iter_tree(root_path, skip_hidden=True, skip_dirs=SKIP_DIRS):
+                for file, file_path, size, modified_time in file_rows(columns):
+                    yield (clean_text(file_path), clean_text(file), size, modified_time)
+                    scanned += 1
+                    if progress_callback and scanned % 1000 == 0:
+                        progress_callback(scanned)
+        
+        # Stream the walk into a TEMP table and diff it against the index with
+        # three set-based statements instead of a lookup and a write per file
+        with self.conn:
+            self.conn.execute('''
+                CREATE TEMP TABLE IF NOT EXISTS scan_files (
+                    path TEXT PRIMARY KEY, name TEXT, size INTEGER, modified INTEGER
+                )
+            ''')
+            self.conn.execute("DELETE FROM scan_files")
+            self.conn.executemany("INSERT OR IGNORE INTO scan_files VALUES (?, ?, ?, ?)", scan_rows())
             
-            for file in files:
-                if file.startswith('.'):
-                    continue
-                    
-                try:
-                    file_path = os.path.join(root, file)
-                    current_files.add(file_path)
-                    
-                    stat_info = os.stat(file_path)
-                    modified_time = int(stat_info.st_mtime)
-                    
-                    # Check if file needs to be indexed/updated
-                    cursor = self.conn.execute(
-                        "SELECT modified FROM files WHERE path = ?", (file_path,)
-                    )
-                    existing = cursor.fetchone()
-                    
-                    if not existing:
-                        # New file
-                        self._add_file_to_index(file_path, stat_info)
-                        new_files += 1
-                    elif existing[0] != modified_time:
-                        # File was modified
-                        self._update_file_in_index(file_path, stat_info)
-                        updated_files += 1
-                    else:
-                        # File unchanged
-                        skipped_files += 1
-                        
-                    # Report progress
-                    if progress_callback and (new_files + updated_files + skipped_files) % 1000 == 0:
-                        progress_callback(new_files + updated_files + skipped_files)
-                        
-                except (OSError, PermissionError, UnicodeDecodeError, UnicodeEncodeError):
-                    continue
-        
-        # Remove files that no longer exist
-        cursor = self.conn.execute(
-            "SELECT path FROM files WHERE path LIKE ?", (root_path + "%",)
-        )
-        indexed_files = {row[0] for row in cursor.fetchall()}
-        deleted_files = indexed_files - current_files
-        
-        if deleted_files:
-            # Batch delete operations to avoid "too many SQL variables" error
-            batch_size = 500  # SQLite limit is usually 999, use 500 to be safe
-            deleted_files_list = list(deleted_files)
+            # New files
+            new_files = self.conn.execute('''
+                INSERT INTO files (name, path, size, modified, indexed_at)
+                SELECT name, path, size, modified, ? FROM scan_files
+                WHERE NOT EXISTS (SELECT 1 FROM files WHERE files.path = scan_files.path)
+            ''', (current_time,)).rowcount
             
-            for i in range(0, len(deleted_files_list), batch_size):
-                batch = deleted_files_list[i:i + batch_size]
-                placeholders = ",".join("?" * len(batch))
-                self.conn.execute(
-                    f"DELETE FROM files WHERE path IN ({placeholders})",
-                    batch
-                )
-            print(f"Removed {len(deleted_files)} deleted files from index")
+            # Files modified since they were indexed; correlated subqueries
+            # rather than UPDATE ... FROM, which needs SQLite 3.33
+            updated_files = self.conn.execute('''
+                UPDATE files SET (size, modified) = (
+                    SELECT size, modified FROM scan_files WHERE scan_files.path = files.path
+                ), indexed_at = ?
+                WHERE path >= ? AND path < ?
+                AND modified <> (SELECT modified FROM scan_files WHERE scan_files.path = files.path)
+            ''', (current_time, *bounds)).rowcount
             
-        # Update index_paths table
-        total_files = len(current_files)
-        self.conn.execute('''
-            INSERT OR REPLACE INTO index_paths (path, last_indexed, file_count)
-            VALUES (?, ?, ?)
-        ''', (root_path, current_time, total_files))
-        
-        self.conn.commit()
+            # Remove files that no longer exist
+            deleted_files = self.conn.execute('''
+                DELETE FROM files WHERE path >= ? AND path < ?
+                AND path NOT IN (SELECT path FROM scan_files)
+            ''', bounds).rowcount
+            if deleted_files:
+                print(f"Removed {deleted_files} deleted files from index")
+            
+            # Update index_paths table
+            total_files = self.conn.execute("SELECT COUNT(*) FROM scan_files").fetchone()[0]
+            skipped_files = total_files - new_files - updated_files
+            self.conn.execute('''
+                INSERT OR REPLACE INTO index_paths (path, last_indexed, file_count)
+                VALUES (?, ?, ?)
+            ''', (root_path, current_time, total_files))
+            
+            self.conn.execute("DELETE FROM scan_files")
         
         print(f"Incremental index complete:")
         print(f"  New files: {new_files}")
         print(f"  Updated files: {updated_files}")
         print(f"  Unchanged files: {skipped_files}")
-        print(f"  Deleted files: {len(deleted_files)}")
+        print(f"  Deleted files: {deleted_files}")
         print(f"  Total files: {total_files}")
         
-        return new_files + updated_files + len(deleted_files)  # Return number of changes
-        
-    def _add_file_to_index(self, file_path: str, stat_info):
-        """Add a single file to the index"""
-        filename = os.path.basename(file_path)
-        safe_name = self._safe_encode_string(filename)
-        safe_path = self._safe_encode_string(file_path)
-        
-        self.conn.execute('''
-            INSERT INTO files (name, path, size, modified, indexed_at)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (safe_name, safe_path, stat_info.st_size, int(stat_info.st_mtime), int(time.time())))
-        
-    def _update_file_in_index(self, file_path: str, stat_info):
-        """Update an existing file in the index"""
-        filename = os.path.basename(file_path)
-        safe_name = self._safe_encode_string(filename)
-        safe_path = self._safe_encode_string(file_path)
-        
-        self.conn.execute('''
-            UPDATE files SET name = ?, size = ?, modified = ?, indexed_at = ?
-            WHERE path = ?
-        ''', (safe_name, stat_info.st_size, int(stat_info.st_mtime), int(time.time()), safe_path))
+        return new_files + updated_files + deleted_files  # Return number of changes
         
     def get_indexed_paths(self):
         """Get list of previously indexed paths"""
@@ -284,60 +448,94 @@ class FileIndexer:
         if not query:
             return []
         
-        # Convert wildcards to SQL LIKE pattern
-        if '*' in query or '?' in query:
-            sql_pattern = query.replace('*', '%').replace('?', '_')
+        # data_version changes when another connection commits and
+        # total_changes when this one writes, either drops the cached results
+        state = (self.conn.execute('PRAGMA data_version').fetchone()[0], self.conn.total_changes)
+        if state != self._search_cache_state:
+            self._search_cache.clear()
+            self._search_cache_state = state
+        
+        key = (query, limit, case_sensitive)
+        rows = self._search_cache.get(key)
+        if rows is not None:
+            self._search_cache.move_to_end(key)
+        else:
+            rows = self._search(query, limit, case_sensitive)
+            if limit <= self.SEARCH_CACHE_MAX_LIMIT:
+                self._search_cache[key] = rows
+                if len(self._search_cache) > self.SEARCH_CACHE_SIZE:
+                    self._search_cache.popitem(last=False)
+        
+        # The cache holds immutable row tuples; every caller gets its own dicts
+        return [
+            {'name': name, 'path': path, 'size': size, 'modified': modified}
+            for name, path, size, modified in rows
+        ]
+    
+    def _search(self, query: str, limit: int, case_sensitive: bool) -> tuple:
+        """Run a search against the database, returning (name, path, size, modified) rows"""
+        # Substrings of 3+ characters are looked up in the trigram index
+        if self.fts_enabled and len(query) >= 3 and '*' not in query and '?' not in query:
             sql_query = '''
+                SELECT files.name, files.path, files.size, files.modified
+                FROM files_fts JOIN files ON files.id = files_fts.rowid
+                WHERE files_fts MATCH ?
+            '''
+            # Quoted as an FTS5 string so the whole query is one substring
+            params = ['"' + query.replace('"', '""') + '"']
+            if case_sensitive:
+                # The trigram index is case-insensitive, narrow to exact case
+                sql_query += ' AND instr(files.name, ?) > 0'
+                params.append(query)
+            sql_query += ' ORDER BY files.name LIMIT ?'
+            params.append(limit)
+        else:
+            wildcard = '*' in query or '?' in query
+            if case_sensitive:
+                # GLOB matches case-sensitively and takes * and ? as they are;
+                # only '[' needs escaping, as a one-character class
+                operator = 'GLOB'
+                sql_pattern = query.replace('[', '[[]')
+                if not wildcard:
+                    sql_pattern = f'*{sql_pattern}*'
+            else:
+                # LIKE ignores ASCII case; wrapping both sides in LOWER()
+                # would only add a function call per row
+                operator = 'LIKE'
+                if wildcard:
+                    # Convert wildcards to SQL LIKE pattern
+                    sql_pattern = query.replace('*', '%').replace('?', '_')
+                else:
+                    # Simple substring search
+                    sql_pattern = f'%{query}%'
+            # Prefix patterns range-scan idx_name (GLOB) or idx_name_nocase (LIKE)
+            sql_query = f'''
                 SELECT name, path, size, modified 
                 FROM files 
-                WHERE name LIKE ? 
+                WHERE name {operator} ? 
                 ORDER BY name 
                 LIMIT ?
             '''
-            params = (sql_pattern if case_sensitive else sql_pattern.lower(), limit)
-        else:
-            # Simple substring search
-            if case_sensitive:
-                sql_query = '''
-                    SELECT name, path, size, modified 
-                    FROM files 
-                    WHERE name LIKE ? 
-                    ORDER BY name 
-                    LIMIT ?
-                '''
-                params = (f'%{query}%', limit)
-            else:
-                sql_query = '''
-                    SELECT name, path, size, modified 
-                    FROM files 
-                    WHERE LOWER(name) LIKE LOWER(?) 
-                    ORDER BY name 
-                    LIMIT ?
-                '''
-                params = (f'%{query}%', limit)
+            params = (sql_pattern, limit)
         
-        cursor = self.conn.execute(sql_query, params)
-        results = []
-        
-        for row in cursor.fetchall():
-            results.append({
-                'name': row[0],
-                'path': row[1],
-                'size': row[2],
-                'modified': row[3]
-            })
-        
-        return results
+        return tuple(self.conn.execute(sql_query, params))
     
     def close(self):
         """Close database connection"""
         if self.conn:
+            try:
+                # Refresh planner statistics the connection's queries would benefit from
+                self.conn.execute('PRAGMA optimize')
+            except sqlite3.Error:
+                pass
             self.conn.close()
 
 
 class FileSearchApp:
     """Main application class"""
     
+    _SIZE_SUFFIXES = ('B', 'KB', 'MB', 'GB')
+    
     def __init__(self, enable_monitoring: bool = False):
         self.indexer = FileIndexer()
         self.monitor = None
@@ -462,21 +660,23 @@ class FileSearchApp:
         print(f"\nFound {len(results)} files (search took {search_time:.1f}ms)")
         print("-" * 80)
         
+        # Times are shown to the minute, so results in the same minute share one strftime
+        mtime_strings = {}
         for result in results:
             size_str = self._format_size(result['size'])
-            mod_time = time.strftime('%Y-%m-%d %H:%M', time.localtime(result['modified']))
+            minute = result['modified'] // 60
+            mod_time = mtime_strings.get(minute)
+            if mod_time is None:
+                mod_time = mtime_strings[minute] = time.strftime('%Y-%m-%d %H:%M', time.localtime(minute * 60))
             print(f"{result['name']:<40} {size_str:>10} {mod_time} {result['path']}")
     
     def _format_size(self, size_bytes: int) -> str:
         """Format file size in human readable format"""
-        if size_bytes < 1024:
+        # Every 10 bits is one unit step, so the bit length picks the unit directly
+        unit = min((size_bytes.bit_length() - 1) // 10, 3)
+        if unit <= 0:
             return f"{size_bytes}B"
-        elif size_bytes < 1024 * 1024:
-            return f"{size_bytes/1024:.1f}KB"
-        elif size_bytes < 1024 * 1024 * 1024:
-            return f"{size_bytes/(1024*1024):.1f}MB"
-        else:
-            return f"{size_bytes/(1024*1024*1024):.1f}GB"
+        return f"{size_bytes / (1 << 10 * unit):.1f}{self._SIZE_SUFFIXES[unit]}"
     
     def interactive_mode(self):
         """Run in interactive search mode"""